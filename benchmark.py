@@ -0,0 +1,180 @@
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+import generator
+
+"""Build a synthetic execution history in the IBKR /iserver/account/trades format"""
+def make_executions(count=200000, instruments=2000, seed=7):
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 2, 9, 30)
+    executions = []
+
+    for i in range(count):
+        n = rng.randrange(instruments)
+        is_option = n % 3 == 0
+        side = rng.choice(['B', 'S'])
+        size = rng.choice([1, 2, 5, 10]) if is_option else rng.choice([10, 25, 50, 100])
+        price = round(rng.uniform(0.5, 15) if is_option else rng.uniform(10, 500), 2)
+        trade_time = start + timedelta(seconds=i * 30)
+
+        execution = {
+            'execution_id': f"0000e0d5.{i:08x}.01.01",
+            'symbol': f"SYM{n // 3 if is_option else n}",
+            'sec_type': 'OPT' if is_option else 'STK',
+            'side': side,
+            'size': size,
+            'price': price,
+            'commission': round(rng.uniform(0.3, 1.5), 2),
+            'net_amount': round(size * price * (100 if is_option else 1), 2),
+            'trade_time': trade_time.strftime("%Y%m%d-%H:%M:%S"),
+        }
+        if is_option:
+            execution['contract_description_2'] = f"Sep19 '25 {50 + n % 40} {'Call' if n % 2 else 'Put'}"
+            execution['put_or_call'] = 'C' if n % 2 else 'P'
+        executions.append(execution)
+
+    return executions
+
+"""Time the serial matcher against the process-pool matcher at several worker counts"""
+def bench_matching(executions, worker_counts=(1, 2, 4, 8)):
+    print(f"🔬 Matching {len(executions)} executions")
+
+    for workers in worker_counts:
+        started = time.perf_counter()
+        if workers == 1:
+            matched, unmatched = generator.match_buy_sell_pairs(executions)
+        else:
+            matched, unmatched = generator.match_buy_sell_pairs_parallel(executions, workers)
+        elapsed = time.perf_counter() - started
+        print(f"   {workers} worker(s): {elapsed:.2f}s ({len(matched)} round trips, {len(unmatched)} open)")
+
+"""Time regenerating the round trips under each lot relief method"""
+def bench_lot_methods(executions):
+    print(f"🔬 Relieving lots for {len(executions)} executions")
+
+    for method in generator.LOT_METHODS:
+        started = time.perf_counter()
+        matched, unmatched = generator.match_buy_sell_pairs(executions, method)
+        elapsed = time.perf_counter() - started
+        print(f"   {method.upper():8} {elapsed:.2f}s ({len(matched)} round trips, {len(unmatched)} open)")
+
+"""Peak traced memory and time of the post-matching pipeline (trade log + open positions)"""
+def bench_pipeline(executions, net_liq=100000.0):
+    import tracemalloc
+
+    matched, unmatched = generator.match_buy_sell_pairs(executions)
+    print(f"🔬 Building reports from {len(matched)} round trips and {len(unmatched)} open lots")
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    trade_log = generator.consolidate_final_trades(generator.build_trade_log_from_matched(matched, net_liq))
+    open_log = generator.consolidate_open_positions(generator.build_unmatched_executions_log(unmatched))
+    generator.format_for_export(trade_log, list(trade_log.columns))
+    generator.format_for_export(open_log, list(open_log.columns))
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"   {elapsed:.2f}s, peak {peak / 1024 / 1024:.1f} MiB ({len(trade_log)} trades, {len(open_log)} open positions)")
+
+"""Replay the same executions from JSON and from the binary journal through the matcher"""
+def bench_journal(executions):
+    import json
+    import os
+    import tempfile
+    from exec_journal import ExecutionJournal
+
+    print(f"🔬 Replaying {len(executions)} executions")
+    raw = json.dumps(executions)
+
+    started = time.perf_counter()
+    generator.match_buy_sell_pairs(json.loads(raw))
+    print(f"   JSON:    {time.perf_counter() - started:.2f}s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = ExecutionJournal(os.path.join(tmp, "executions.bin"))
+        journal.append(executions)
+
+        started = time.perf_counter()
+        rows = ExecutionJournal(journal.path).executions()
+        loaded = time.perf_counter() - started
+        generator.match_buy_sell_pairs(rows)
+        print(f"   Journal: {time.perf_counter() - started:.2f}s (load {loaded:.2f}s, {os.path.getsize(journal.path) / 1024 / 1024:.1f} MiB on disk)")
+
+"""Render the trade log to every format one at a time, then as one render_reports batch"""
+def bench_render(executions, net_liq=100000.0):
+    import os
+    import tempfile
+    import exporter
+
+    matched, _ = generator.match_buy_sell_pairs(executions)
+    trade_log = generator.consolidate_final_trades(generator.build_trade_log_from_matched(matched, net_liq))
+    df = generator.format_for_export(trade_log, list(trade_log.columns))
+    print(f"🔬 Rendering {len(df)} trades to {', '.join(exporter.WRITERS)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        slowest = 0.0
+        for fmt, write in exporter.WRITERS.items():
+            started = time.perf_counter()
+            write(df, os.path.join(tmp, f"serial.{fmt}"))
+            elapsed = time.perf_counter() - started
+            slowest = max(slowest, elapsed)
+            print(f"   {fmt:5} {elapsed:.2f}s")
+
+        manifest = exporter.ReportManifest(os.path.join(tmp, "manifest.json"))
+        _, elapsed = exporter.render_reports(df, os.path.join(tmp, "report"), list(exporter.WRITERS), manifest)
+        print(f"   render_reports batch ({os.cpu_count()} CPUs): {elapsed:.2f}s (slowest single format {slowest:.2f}s)")
+
+"""Group synthetic option legs into spreads at growing sizes to check the sweep scales linearly"""
+def bench_spreads(executions, sizes=(100000, 200000, 400000)):
+    import numpy as np
+    import pandas as pd
+    from spreads import group_spreads
+
+    rng = np.random.default_rng(7)
+    for size in sizes:
+        # Spreads of 1-4 legs opened a few seconds apart, on 500 underlyings and 8 expiries
+        spread_count = size // 2
+        legs_per_spread = rng.integers(1, 5, spread_count)
+        spread_of_leg = np.repeat(np.arange(spread_count), legs_per_spread)[:size]
+        opened = pd.Timestamp("2024-01-02 09:30") + pd.to_timedelta(spread_of_leg * 600 + rng.integers(0, 5, len(spread_of_leg)), unit='s')
+        legs = pd.DataFrame({
+            "symbol": np.char.add("SYM", (spread_of_leg % 500).astype(str)),
+            "expiry": np.char.add("Sep", (spread_of_leg % 8 + 10).astype(str)),
+            "strike": (rng.integers(80, 120, len(spread_of_leg)) * 5).astype('float64'),
+            "right": rng.choice(['C', 'P'], len(spread_of_leg)),
+            "direction": rng.choice(['LONG', 'SHORT'], len(spread_of_leg)),
+            "quantity": 1.0,
+            "open_date": opened,
+            "close_date": opened + pd.Timedelta(hours=2),
+            "sizing": rng.uniform(50, 500, len(spread_of_leg)),
+            "gross_pnl": rng.normal(0, 50, len(spread_of_leg)),
+            "net_pnl": rng.normal(0, 50, len(spread_of_leg)),
+            "commission": 1.3,
+        })
+
+        started = time.perf_counter()
+        spreads = group_spreads(legs, window=60, net_liq=100000.0)
+        elapsed = time.perf_counter() - started
+        print(f"   {len(legs):7} legs -> {len(spreads):6} spreads in {elapsed:.2f}s ({elapsed / len(legs) * 1e6:.1f}µs per leg)")
+
+SUITES = {
+    'matching': bench_matching,
+    'lots': bench_lot_methods,
+    'pipeline': bench_pipeline,
+    'journal': bench_journal,
+    'render': bench_render,
+    'spreads': bench_spreads,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks for the trade report pipeline")
+    parser.add_argument("suite", nargs="?", choices=list(SUITES), default="matching")
+    parser.add_argument("--executions", type=int, default=200000)
+    parser.add_argument("--instruments", type=int, default=2000)
+    args = parser.parse_args()
+
+    executions = make_executions(args.executions, args.instruments)
+    SUITES[args.suite](executions)
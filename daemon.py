@@ -0,0 +1,200 @@
+import argparse
+import json
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+import generator
+
+DAEMON_HOST = generator.cfg.get("daemon_host", "127.0.0.1")
+DAEMON_PORT = generator.cfg.get("daemon_port", 8765)
+DAEMON_REFRESH = generator.cfg.get("daemon_refresh", 60)  # Seconds between incremental refreshes
+
+def execution_key(trade):
+    """Stable identity for an execution across refreshes"""
+    return trade.get('execution_id') or (trade.get('symbol'), trade.get('side'), trade.get('size'),
+                                         trade.get('price'), trade.get('trade_time'))
+
+def to_json(payload):
+    # numpy scalars from pandas aggregations expose .item(); anything else is stringified
+    return json.dumps(payload, default=lambda o: o.item() if hasattr(o, 'item') else str(o)).encode('utf-8')
+
+
+def frame_to_json(df):
+    return df.to_json(orient='records', date_format='iso').encode('utf-8')
+
+
+class ReportState:
+    """Warm, incrementally refreshed journal state served by the daemon
+
+    Executions accumulate across refreshes keyed by execution id, and only the
+    instruments that received new executions are re-matched. Responses are
+    serialized once per refresh, so requests are a dictionary lookup.
+    """
+
+    def __init__(self, lot_method=generator.LOT_METHOD, keepalive=None):
+        self.lot_method = lot_method
+        self.keepalive = keepalive
+        self.journal = generator.ExecutionJournal(generator.JOURNAL_PATH) if generator.JOURNAL_PATH else None
+        self.nlv_history = None  # Opened on the refresh thread, which owns the SQLite connection
+        self.executions = {}  # execution key -> execution
+        self.by_instrument = defaultdict(list)
+        self.matched = {}  # instrument -> matched round trips
+        self.unmatched = {}  # instrument -> open lots
+        self.net_liq = 0.0
+        self.refreshed_at = None
+        self.last_error = None
+        self.refresh_seconds = 0.0
+
+        self.lock = threading.Lock()
+        self.responses = {}
+        self._publish(pd.DataFrame(), pd.DataFrame())
+
+    def merge(self, trades):
+        """Add unseen executions; returns the instruments that changed"""
+        changed = set()
+        for trade in trades:
+            key = execution_key(trade)
+            if key in self.executions:
+                continue
+            instrument = generator.parse_instrument_name(trade)
+            self.executions[key] = trade
+            self.by_instrument[instrument].append(trade)
+            changed.add(instrument)
+        return changed
+
+    def refresh(self):
+        if self.keepalive is not None and not self.keepalive.is_ready():
+            print(f"⏸️ Skipping refresh, gateway session not ready: {self.keepalive.describe()}")
+            return
+
+        started = time.perf_counter()
+        try:
+            self.net_liq = generator.get_net_liq()
+            net_liq_at = None
+            if generator.NLV_HISTORY:
+                if self.nlv_history is None:
+                    self.nlv_history = generator.NetLiqHistory(generator.NLV_HISTORY)
+                self.nlv_history.record(generator.ACCOUNT_ID, self.net_liq)
+                net_liq_at = partial(self.nlv_history.at, generator.ACCOUNT_ID, default=self.net_liq)
+            trades = generator.get_trades_and_orders(7)
+            if self.journal is not None:
+                self.journal.append(trades)
+            changed = self.merge(trades)
+
+            for instrument in changed:
+                matched, unmatched = generator.match_instrument_trades(self.by_instrument[instrument], self.lot_method)
+                self.matched[instrument] = matched
+                self.unmatched[instrument] = unmatched
+
+            # Account % depends on net liq (the latest value for recent closes), so the log itself is rebuilt every time
+            all_matched = [trade for matched in self.matched.values() for trade in matched]
+            all_unmatched = [trade for unmatched in self.unmatched.values() for trade in unmatched]
+            trade_log = generator.consolidate_final_trades(generator.build_trade_log_from_matched(all_matched, self.net_liq, net_liq_at))
+            open_log = generator.consolidate_open_positions(generator.build_unmatched_executions_log(all_unmatched))
+
+            self.last_error = None
+            self.refreshed_at = datetime.now()
+            self.refresh_seconds = time.perf_counter() - started
+            self._publish(trade_log, open_log)
+            print(f"🔄 Refreshed in {self.refresh_seconds:.2f}s: {len(changed)} instruments changed, "
+                  f"{len(trade_log)} trades, {len(open_log)} open positions")
+
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"❌ Refresh failed: {e}")
+            with self.lock:
+                self.responses['/summary'] = to_json(dict(self.summary, last_error=self.last_error))
+
+    def _publish(self, trade_log, open_log):
+        outcomes = trade_log['OUTCOME'] if 'OUTCOME' in trade_log else pd.Series(dtype='float64')
+        wins = outcomes[outcomes > 0]
+        losses = outcomes[outcomes < 0]
+
+        self.summary = {
+            'account_id': generator.ACCOUNT_ID,
+            'net_liquidation': self.net_liq,
+            'lot_method': self.lot_method,
+            'trades': len(trade_log),
+            'open_positions': len(open_log),
+            'total_pnl': round(float(outcomes.sum()), 2),
+            'winning_trades': len(wins),
+            'losing_trades': len(losses),
+            'win_rate': round(len(wins) / (len(wins) + len(losses)) * 100, 1) if len(wins) or len(losses) else None,
+            'executions': len(self.executions),
+            'refreshed_at': self.refreshed_at.isoformat() if self.refreshed_at else None,
+            'refresh_seconds': round(self.refresh_seconds, 3),
+            'last_error': self.last_error,
+        }
+        responses = {
+            '/trades': frame_to_json(trade_log),
+            '/open-positions': frame_to_json(open_log),
+            '/summary': to_json(self.summary),
+        }
+        with self.lock:
+            self.responses = responses
+
+    def response(self, path):
+        with self.lock:
+            return self.responses.get(path)
+
+    def run(self, interval=DAEMON_REFRESH, stopping=None):
+        """Refresh forever (until stopping is set), one refresh every interval seconds"""
+        stopping = stopping or threading.Event()
+        while not stopping.is_set():
+            self.refresh()
+            stopping.wait(interval)
+
+
+def make_handler(state):
+    class ReportHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split('?', 1)[0].rstrip('/') or '/'
+            if path == '/metrics':
+                body = to_json(generator.gateway.metrics())
+            else:
+                body = state.response(path)
+            if body is None:
+                self.send_error(404, "Try /trades, /open-positions or /summary")
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Keep the console for refresh output
+
+    return ReportHandler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the IBKR trading journal as JSON from a local port")
+    parser.add_argument("--host", default=DAEMON_HOST)
+    parser.add_argument("--port", type=int, default=DAEMON_PORT)
+    parser.add_argument("--refresh", type=float, default=DAEMON_REFRESH, help="Seconds between refreshes")
+    parser.add_argument("--lot-method", choices=list(generator.LOT_METHODS), default=generator.LOT_METHOD)
+    args = parser.parse_args()
+
+    keepalive = generator.SessionKeepalive(generator.gateway, interval=generator.KEEPALIVE_INTERVAL).start()
+    if not keepalive.wait_ready(generator.READY_TIMEOUT):
+        print(f"⚠️ Gateway session is not ready yet: {keepalive.describe()}")
+
+    state = ReportState(args.lot_method, keepalive)
+    threading.Thread(target=state.run, args=(args.refresh,), name="report-refresh", daemon=True).start()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    print(f"🛰️ Serving /trades, /open-positions and /summary on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("👋 Shutting down")
+    finally:
+        keepalive.stop()
+        server.server_close()
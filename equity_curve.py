@@ -0,0 +1,95 @@
+import pandas as pd
+
+"""Realized P&L through time: closed round trips bucketed per minute, hour or day
+
+TradeDB keeps per-bucket sums in its equity_buckets table, adjusted on every sync by
+the round trips that were added or removed, so the curve itself is a cumulative sum
+over a handful of sorted rows rather than a pass over the whole trade history.
+"""
+
+# Curve granularity -> pandas frequency
+GRANULARITIES = {
+    '1min': '1min',
+    '1h': '1h',
+    'daily': '1D',
+}
+
+def bucket_pnl(close_times, net_pnl, granularity):
+    """Count and sum net P&L per bucket; returns a frame indexed by bucket start, oldest first"""
+    df = pd.DataFrame({
+        'bucket': pd.to_datetime(pd.Series(close_times)).dt.floor(GRANULARITIES[granularity]),
+        'net_pnl': pd.Series(net_pnl, dtype='float64').to_numpy(),
+    })
+    return df.groupby('bucket', sort=True)['net_pnl'].agg(trades='count', net_pnl='sum')
+
+def build_curve(buckets, unrealized=None, dense=False, granularity='1h'):
+    """Equity curve from stored bucket sums (bucket, trades, net_pnl)
+
+    dense resamples to every bucket in the range, carrying the cumulative P&L through
+    quiet periods (handy for charts); otherwise only buckets with closes are returned.
+    Open lots are marked once, for now, so unrealized P&L only lands on the last row;
+    with no mark (None) the column is left empty and Equity is the realized P&L.
+    """
+    columns = ["TIME", "Trades", "Realized P&L", "Cumulative P&L", "Unrealized P&L", "Equity"]
+    if buckets.empty:
+        return pd.DataFrame(columns=columns)
+
+    series = buckets.assign(bucket=pd.to_datetime(buckets['bucket'])).set_index('bucket').sort_index()
+    if dense:
+        series = series.resample(GRANULARITIES[granularity]).sum()
+
+    curve = pd.DataFrame({
+        "TIME": series.index,
+        "Trades": series['trades'].astype('int64').to_numpy(),
+        "Realized P&L": series['net_pnl'].round(2).to_numpy(),
+        "Cumulative P&L": series['net_pnl'].cumsum().round(2).to_numpy(),
+    })
+    if unrealized is None:
+        curve["Unrealized P&L"] = float('nan')
+        curve["Equity"] = curve["Cumulative P&L"]
+        return curve
+    curve["Unrealized P&L"] = 0.0
+    curve.loc[curve.index[-1], "Unrealized P&L"] = round(unrealized, 2)
+    curve["Equity"] = (curve["Cumulative P&L"] + curve["Unrealized P&L"]).round(2)
+    return curve
+
+def unrealized_pnl(open_lots, executions):
+    """Mark open lots to the last price their instrument traded at after the lot was opened
+
+    A lot whose instrument has not traded since it opened has no price to mark it at
+    (its own fill is not a mark), so it is left out rather than valued at zero change.
+    Returns (unrealized P&L of the marked lots or None if none could be marked,
+    number of lots left unmarked).
+    """
+    from generator import parse_instrument_name, parse_trade_time
+
+    if not open_lots:
+        return None, 0
+
+    def times(rows):
+        return pd.to_datetime(pd.Series([parse_trade_time(t['trade_time']) if t.get('trade_time') else None
+                                         for t in rows], dtype=object))
+
+    trades = pd.DataFrame({
+        'instrument': [parse_instrument_name(t) for t in executions],
+        'time': times(executions),
+        'price': pd.to_numeric(pd.Series([t.get('price', 0) for t in executions]), errors='coerce'),
+    })
+    last = trades.dropna().sort_values('time', kind='stable').groupby('instrument').last()
+
+    lots = pd.DataFrame({
+        'instrument': [parse_instrument_name(t) for t in open_lots],
+        'time': times(open_lots),
+        'side': [t.get('side') for t in open_lots],
+        'size': pd.to_numeric(pd.Series([t.get('size', 0) for t in open_lots]), errors='coerce'),
+        'price': pd.to_numeric(pd.Series([t.get('price', 0) for t in open_lots]), errors='coerce'),
+        'multiplier': [100.0 if t.get('sec_type') == 'OPT' else 1.0 for t in open_lots],
+    })
+    marked = lots['instrument'].map(last['time']) > lots['time']
+    if not marked.any():
+        return None, len(lots)
+
+    lots = lots[marked]
+    sign = lots['side'].map({'B': 1.0, 'S': -1.0}).fillna(0.0)
+    mark = lots['instrument'].map(last['price'])
+    return float(((mark - lots['price']) * lots['size'] * lots['multiplier'] * sign).sum()), int((~marked).sum())
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends from separate processes are not serialised
+    fcntl = None
+
+"""Fixed-width binary execution journal, read back zero-copy through numpy.memmap
+
+journal.bin holds a 16-byte header followed by one RECORD_DTYPE row per execution.
+Instruments (symbol, sec_type, contract description, put/call) are interned into
+journal.bin.instruments.json and rows refer to them by id, so replaying a journal
+is a memmap plus a handful of vectorised operations: no JSON or date parsing.
+"""
+
+MAGIC = b"IBKRJRN1"
+HEADER_SIZE = 16
+
+RECORD_DTYPE = np.dtype([
+    ('trade_time', '<i8'),      # Seconds since the epoch, UTC
+    ('exec_hash', '<u8'),       # 64-bit hash of the execution id, for de-duplication
+    ('instrument_id', '<i4'),
+    ('side', 'i1'),             # 1 = buy, -1 = sell
+    ('pad', 'V3'),
+    ('size', '<f8'),
+    ('price', '<f8'),
+    ('commission', '<f8'),
+    ('net_amount', '<f8'),
+])
+
+INSTRUMENT_FIELDS = ('symbol', 'sec_type', 'contract_description_2', 'put_or_call')
+SIDES = {'B': 1, 'S': -1}
+
+def execution_hash(trade):
+    """Stable 64-bit id for an execution (falls back to its contents when there is no id)
+
+    Rows replayed from the journal carry the hash they were stored under as exec_hash.
+    """
+    if trade.get('exec_hash') is not None:
+        return trade['exec_hash']
+    key = trade.get('execution_id') or json.dumps(
+        [trade.get(f) for f in INSTRUMENT_FIELDS + ('side', 'size', 'price', 'trade_time')], default=str)
+    return int.from_bytes(hashlib.blake2b(str(key).encode('utf-8'), digest_size=8).digest(), 'little')
+
+def to_epoch(trade_time):
+    return int(datetime.strptime(trade_time, "%Y%m%d-%H:%M:%S").replace(tzinfo=timezone.utc).timestamp())
+
+
+class ExecutionJournal:
+    """Append-only execution journal backed by a fixed-width binary file"""
+
+    def __init__(self, path="executions.bin"):
+        self.path = path
+        self.instruments_path = f"{path}.instruments.json"
+        self._load_instruments()
+
+    def _load_instruments(self):
+        self.instruments = []
+        if os.path.exists(self.instruments_path):
+            with open(self.instruments_path, "r", encoding="utf-8") as f:
+                self.instruments = [tuple(instrument) for instrument in json.load(f)]
+        self.instrument_ids = {instrument: i for i, instrument in enumerate(self.instruments)}
+
+    def __len__(self):
+        if not os.path.exists(self.path):
+            return 0
+        return (os.path.getsize(self.path) - HEADER_SIZE) // RECORD_DTYPE.itemsize
+
+    def records(self):
+        """All records as a read-only numpy.memmap (an empty array for a new journal)"""
+        count = len(self)
+        if count <= 0:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        with open(self.path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{self.path} is not an execution journal")
+        return np.memmap(self.path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE, shape=(count,))
+
+    def _intern(self, trade):
+        instrument = tuple(trade.get(field) or '' for field in INSTRUMENT_FIELDS)
+        instrument_id = self.instrument_ids.get(instrument)
+        if instrument_id is None:
+            instrument_id = self.instrument_ids[instrument] = len(self.instruments)
+            self.instruments.append(instrument)
+        return instrument_id
+
+    def _save_instruments(self):
+        directory = os.path.dirname(os.path.abspath(self.instruments_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self.instruments, f)
+        os.replace(tmp_path, self.instruments_path)
+
+    def append(self, trades):
+        """Append executions not already in the journal; returns how many were written
+
+        The daemon, watch mode and one-off runs may all append to the same journal, so
+        the whole append happens under an exclusive lock on the journal file, with the
+        instrument table and stored hashes re-read inside it rather than cached.
+        """
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+        with os.fdopen(fd, "r+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)  # Released when the file is closed
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER_SIZE:
+                f.truncate(0)
+                f.write(MAGIC.ljust(HEADER_SIZE, b'\0'))
+                f.flush()
+            elif (size - HEADER_SIZE) % RECORD_DTYPE.itemsize:
+                # A crash mid-write can leave a partial record behind; drop it so rows stay aligned
+                f.truncate(HEADER_SIZE + len(self) * RECORD_DTYPE.itemsize)
+
+            self._load_instruments()
+            hashes = set(self.records()['exec_hash'].tolist())
+
+            rows = []
+            for trade in trades:
+                exec_hash = execution_hash(trade)
+                if exec_hash in hashes or trade.get('side') not in SIDES:
+                    continue
+                hashes.add(exec_hash)
+                rows.append((
+                    to_epoch(trade['trade_time']) if trade.get('trade_time') else 0,
+                    exec_hash,
+                    self._intern(trade),
+                    SIDES[trade['side']],
+                    b'',
+                    float(trade.get('size', 0)),
+                    float(trade.get('price', 0)),
+                    float(trade.get('commission', 0)),
+                    float(trade.get('net_amount', 0)),
+                ))
+
+            if not rows:
+                return 0
+
+            # Instruments first, so every id written below can always be resolved
+            self._save_instruments()
+            f.seek(0, os.SEEK_END)
+            f.write(np.array(rows, dtype=RECORD_DTYPE).tobytes())
+        return len(rows)
+
+    def frame(self, records=None):
+        """Records as a DataFrame for analytics, with instrument fields joined back on"""
+        import pandas as pd
+
+        records = self.records() if records is None else records
+        df = pd.DataFrame({
+            'trade_time': pd.to_datetime(records['trade_time'], unit='s'),
+            'instrument_id': records['instrument_id'],
+            'side': np.where(records['side'] > 0, 'B', 'S'),
+            'size': records['size'],
+            'price': records['price'],
+            'commission': records['commission'],
+            'net_amount': records['net_amount'],
+        })
+        instruments = pd.DataFrame(self.instruments, columns=list(INSTRUMENT_FIELDS))
+        return df.join(instruments, on='instrument_id')
+
+    def executions(self, records=None):
+        """Records as matcher-ready execution rows, grouped by instrument in time order
+
+        trade_time comes back as a datetime, which the matcher accepts as-is, and each
+        row carries its stored exec_hash so it keeps the identity of the live execution.
+        """
+        records = self.records() if records is None else records
+        order = np.lexsort((records['trade_time'], records['instrument_id']))
+        records = records[order]
+
+        times = records['trade_time'].astype('datetime64[s]').tolist()
+        instrument_ids = records['instrument_id'].tolist()
+        sides = np.where(records['side'] > 0, 'B', 'S').tolist()
+        sizes = records['size'].tolist()
+        hashes = records['exec_hash'].tolist()
+        prices = records['price'].tolist()
+        commissions = records['commission'].tolist()
+        net_amounts = records['net_amount'].tolist()
+
+        instrument_rows = [dict(zip(INSTRUMENT_FIELDS, instrument)) for instrument in self.instruments]
+        return [
+            dict(instrument_rows[instrument_ids[i]], exec_hash=hashes[i], trade_time=times[i], side=sides[i],
+                 size=sizes[i], price=prices[i], commission=commissions[i], net_amount=net_amounts[i])
+            for i in range(len(times))
+        ]
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import pandas as pd
+
+"""Report writing that skips unchanged outputs and never leaves a half-written file"""
+
+def frame_digest(df):
+    """Stable content hash of a DataFrame: column names, dtypes and every value"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([[str(col), str(dtype)] for col, dtype in df.dtypes.items()]).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()
+
+def _read_umask():
+    # os.umask can only be read by setting it, which is process-wide, so do it once at
+    # import time, before the keepalive or watch threads can be creating files
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+# Permissions open() gives a new file, applied to reports in place of mkstemp's 0600
+DEFAULT_MODE = 0o666 & ~_read_umask()
+
+def atomic_write(path, write):
+    """Call write(tmp_path) on a temp file next to path, then rename it into place"""
+    directory = os.path.dirname(os.path.abspath(path))
+    suffix = os.path.splitext(path)[1]  # Writers such as to_excel look at the extension
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=suffix)
+    os.close(fd)
+    try:
+        write(tmp_path)
+        # mkstemp creates the file 0600, which the rename would carry over to the report
+        os.chmod(tmp_path, DEFAULT_MODE)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class ReportManifest:
+    """Sidecar JSON file remembering the content hash each output was last written from"""
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.digests = json.load(f)
+        except (OSError, ValueError):
+            self.digests = {}
+
+    def is_current(self, output, digest):
+        return self.digests.get(os.path.basename(output)) == digest and os.path.exists(output)
+
+    def record(self, output, digest):
+        self.digests[os.path.basename(output)] = digest
+        atomic_write(self.path, self._dump)
+
+    def _dump(self, tmp_path):
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.digests, f, indent=2, sort_keys=True)
+
+
+def write_excel(df, path):
+    df.to_excel(path, index=False, engine='openpyxl')
+
+def write_csv(df, path):
+    df.to_csv(path, index=False)
+
+HTML_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: sans-serif; margin: 2em; }}
+table {{ border-collapse: collapse; font-size: 13px; }}
+th, td {{ padding: 4px 8px; border-bottom: 1px solid #ddd; text-align: left; white-space: nowrap; }}
+th {{ background: #f4f4f4; position: sticky; top: 0; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+{table}
+</body>
+</html>
+"""
+
+def write_html(df, path, title="IBKR Trade Journal"):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(HTML_PAGE.format(title=title, table=df.to_html(index=False, border=0, na_rep='')))
+
+WRITERS = {
+    'xlsx': write_excel,
+    'csv': write_csv,
+    'html': write_html,
+}
+
+def _render(df, path, fmt, title):
+    """Worker: write one format atomically; returns seconds spent"""
+    started = time.perf_counter()
+    write = partial(write_html, title=title) if fmt == 'html' else WRITERS[fmt]
+    atomic_write(path, lambda tmp_path: write(df, tmp_path))
+    return time.perf_counter() - started
+
+_pool = None
+
+def _render_pool():
+    """Process pool shared by every render_reports call, or None with a single CPU
+
+    Starting worker processes costs more than rendering a small report, so one pool
+    is started on first use and kept for the life of the process (every report of a
+    run, and every run in watch mode).
+    """
+    global _pool
+    workers = min(len(WRITERS), os.cpu_count() or 1)
+    if workers <= 1:
+        return None
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=workers)
+    return _pool
+
+def render_reports(df, base_path, formats, manifest):
+    """Render one already formatted frame to base_path.<format> for every format
+
+    The Excel and HTML writers are pure Python and hold the GIL, so on a multi-core
+    machine formats are rendered in separate processes; on a single CPU the workers
+    could only take turns, so they are rendered one after another instead. The frame
+    is formatted and hashed once in the parent, and only formats whose content
+    changed are rendered.
+    Returns ({path: (written, seconds)}, wall seconds for the whole batch).
+    """
+    started = time.perf_counter()
+    digest = frame_digest(df)
+    title = os.path.basename(base_path)
+    paths = {fmt: f"{base_path}.{fmt}" for fmt in formats}
+    stale = [fmt for fmt in formats if not manifest.is_current(paths[fmt], digest)]
+    results = {path: (False, 0.0) for path in paths.values()}
+
+    pool = _render_pool() if len(stale) > 1 else None
+    if pool is None:
+        for fmt in stale:
+            results[paths[fmt]] = (True, _render(df, paths[fmt], fmt, title))
+    else:
+        futures = {fmt: pool.submit(_render, df, paths[fmt], fmt, title) for fmt in stale}
+        for fmt, future in futures.items():
+            results[paths[fmt]] = (True, future.result())
+
+    for fmt in stale:
+        manifest.record(paths[fmt], digest)
+    return results, time.perf_counter() - started
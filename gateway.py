@@ -0,0 +1,211 @@
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import requests
+
+requests.packages.urllib3.disable_warnings()
+
+# Client Portal pacing limits as (requests per second, burst), matched by endpoint fragment.
+# Anything unmatched only counts against the global limit.
+DEFAULT_PACING = {
+    'global': (10, 10),
+    '/iserver/account/trades': (0.2, 1),  # 1 request every 5 seconds
+    '/iserver/auth/status': (1, 1),
+    '/tickle': (1, 1),
+    '/pa/': (0.1, 1),  # Portfolio Analyst: 1 request every 10 seconds
+    '/summary': (1, 1),
+}
+
+class TokenBucket:
+    """Blocking token bucket: `rate` tokens per second, holding at most `burst`"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self):
+        """Take one token if one is available right now; returns whether it did"""
+        with self.lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def acquire(self):
+        """Take one token, sleeping until one is available; returns seconds waited"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class PacingMetrics:
+    """Per endpoint family counters for requests, coalesced calls and queue wait
+
+    Updated from every calling thread, so all reads and writes go through the lock.
+    """
+
+    def __init__(self, window=1000):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.coalesced = 0
+        self.throttled = 0  # 429 responses from the gateway
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.waits = deque(maxlen=window)
+
+    def record_wait(self, waited):
+        with self.lock:
+            self.requests += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            self.waits.append(waited)
+
+    def record_coalesced(self):
+        with self.lock:
+            self.coalesced += 1
+
+    def record_throttled(self):
+        with self.lock:
+            self.throttled += 1
+
+    def snapshot(self):
+        with self.lock:
+            waits = sorted(self.waits)
+            requests, total_wait = self.requests, self.total_wait
+            coalesced, throttled, max_wait = self.coalesced, self.throttled, self.max_wait
+        p95 = waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0.0
+        return {
+            'requests': requests,
+            'coalesced': coalesced,
+            'throttled': throttled,
+            'avg_wait': round(total_wait / requests, 4) if requests else 0.0,
+            'p95_wait': round(p95, 4),
+            'max_wait': round(max_wait, 4),
+        }
+
+
+class GatewayClient:
+    """Thin JSON client for the Client Portal Gateway
+
+    Requests are paced per endpoint family with token buckets so concurrent callers
+    stay under the gateway's limits, identical in-flight GETs are coalesced into one
+    call whose result every caller shares, and an optional response cache sits in front.
+    """
+
+    def __init__(self, base_url="https://localhost:5000", cache=None, pacing=None, max_retries=2):
+        self.base_url = base_url
+        self.cache = cache
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        self.session.verify = False
+
+        pacing = dict(DEFAULT_PACING, **(pacing or {}))
+        self.global_bucket = TokenBucket(*pacing.pop('global'))
+        self.buckets = {family: TokenBucket(rate, burst) for family, (rate, burst) in pacing.items()}
+        self.metrics_by_family = {}
+
+        self.inflight = {}
+        self.inflight_lock = threading.Lock()
+
+    def family(self, endpoint):
+        for fragment in self.buckets:
+            if fragment in endpoint:
+                return fragment
+        return 'other'
+
+    def _metrics(self, family):
+        with self.inflight_lock:
+            return self.metrics_by_family.setdefault(family, PacingMetrics())
+
+    def metrics(self):
+        """Pacing metrics per endpoint family, e.g. for a /metrics endpoint or end-of-run log"""
+        with self.inflight_lock:
+            metrics_by_family = dict(self.metrics_by_family)
+        return {family: m.snapshot() for family, m in metrics_by_family.items()}
+
+    def get_json(self, endpoint, params=None, timeout=10, cached=True):
+        """GET an endpoint (e.g. /v1/api/iserver/account/trades) and return the decoded JSON
+
+        cached=False skips the response cache, for live status such as the auth status.
+        """
+        return self._request('GET', endpoint, params, timeout, cached)
+
+    def post_json(self, endpoint, payload=None, timeout=10, cached=True):
+        """POST a JSON body to a read-only endpoint (e.g. /v1/api/pa/performance) and return the decoded JSON
+
+        Cached, coalesced and paced exactly like a GET, keyed on the body instead of the query string.
+        """
+        return self._request('POST', endpoint, payload, timeout, cached)
+
+    def _request(self, method, endpoint, params, timeout, cached=True):
+        cache = self.cache if cached else None
+        if cache is not None:
+            body = cache.get(endpoint, params)
+            if body is not None:
+                return body
+
+        # Share one in-flight request between concurrent callers asking for the same thing
+        key = (method, endpoint, json.dumps(params or {}, sort_keys=True, default=str))
+        with self.inflight_lock:
+            future = self.inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self.inflight[key] = Future()
+        if not leader:
+            self._metrics(self.family(endpoint)).record_coalesced()
+            return future.result()
+
+        try:
+            body = self._fetch(method, endpoint, params, timeout)
+            future.set_result(body)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.inflight_lock:
+                del self.inflight[key]
+
+        if cache is not None:
+            cache.put(endpoint, params, body)
+        return body
+
+    def _fetch(self, method, endpoint, params, timeout):
+        family = self.family(endpoint)
+        metrics = self._metrics(family)
+
+        for attempt in range(self.max_retries + 1):
+            waited = self.global_bucket.acquire()
+            if family in self.buckets:
+                waited += self.buckets[family].acquire()
+            metrics.record_wait(waited)
+
+            if method == 'POST':
+                resp = self.session.post(f"{self.base_url}{endpoint}", json=params, timeout=timeout)
+            else:
+                resp = self.session.get(f"{self.base_url}{endpoint}", params=params, timeout=timeout)
+            if resp.status_code == 429 and attempt < self.max_retries:
+                metrics.record_throttled()
+                retry_after = resp.headers.get('Retry-After', '1')
+                time.sleep(float(retry_after) if retry_after.replace('.', '', 1).isdigit() else 1)
+                continue
+            resp.raise_for_status()
+            return resp.json()
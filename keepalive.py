@@ -0,0 +1,129 @@
+import threading
+import time
+
+from gateway import GatewayClient
+
+class SessionKeepalive:
+    """Keep the Client Portal session alive and cache its last known auth status
+
+    A background thread tickles the gateway every `interval` seconds. Callers check
+    is_ready() (no network) or block on wait_ready() instead of finding out about a
+    stale session through a 10-15s request timeout. After `failure_threshold` failed
+    checks in a row the circuit opens, and the gateway is left alone for a cooldown
+    that doubles on each further failure up to `max_cooldown`.
+
+    Checks go through `gateway` (a GatewayClient), so they share its connection and
+    count against the same /tickle and auth status pacing as every other caller.
+    `timeout` bounds a whole check, auth status fallback included, so a check always
+    finishes within the generator's gateway_ready_timeout.
+    """
+
+    def __init__(self, gateway=None, interval=60, timeout=3,
+                 max_age=None, failure_threshold=3, cooldown=10, max_cooldown=300):
+        self.gateway = gateway or GatewayClient()
+        self.interval = interval
+        self.timeout = timeout
+        self.max_age = max_age or interval * 2  # Status older than this is not trusted
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+
+        self.status = {}
+        self.checked_at = None
+        self.last_error = None
+        self.failures = 0
+        self.cooldown = cooldown
+        self.open_until = 0.0
+
+        self.ready = threading.Event()
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """Check the session once right away, then keep it alive in the background"""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="ibkr-keepalive", daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout=self.timeout + 1)
+            self.thread = None
+
+    def _run(self):
+        while not self.stopping.is_set():
+            self.check()
+            self.stopping.wait(self.interval)
+
+    def circuit_open(self):
+        return time.monotonic() < self.open_until
+
+    def check(self):
+        """Tickle the gateway and refresh the cached auth status; returns is_ready()"""
+        if self.circuit_open():
+            return False
+
+        started = time.monotonic()
+        try:
+            body = self.gateway.post_json("/v1/api/tickle", timeout=self.timeout, cached=False)
+            status = body.get('iserver', {}).get('authStatus')
+
+            # Older gateways do not include the auth status in the tickle response
+            if status is None:
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    raise TimeoutError(f"tickle used the whole {self.timeout}s check budget")
+                status = self.gateway.get_json("/v1/api/iserver/auth/status", timeout=remaining, cached=False)
+
+            self.status = status
+            self.checked_at = time.time()
+            self.last_error = None
+            self.failures = 0
+            self.cooldown = self.base_cooldown
+
+        except Exception as e:
+            self.last_error = str(e)
+            self.failures += 1
+            self.status = {}
+            if self.failures >= self.failure_threshold:
+                # Stop hammering a gateway that is down; back off further on every miss
+                self.open_until = time.monotonic() + self.cooldown
+                print(f"⚠️ Gateway unreachable ({self.failures} failures), pausing checks for {self.cooldown}s")
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+
+        if self.is_ready():
+            self.ready.set()
+        else:
+            self.ready.clear()
+        return self.is_ready()
+
+    def is_ready(self):
+        """True if the last check, made recently, found an authenticated and connected session"""
+        if self.checked_at is None or time.time() - self.checked_at > self.max_age:
+            return False
+        return bool(self.status.get('authenticated') and self.status.get('connected'))
+
+    def wait_ready(self, timeout=None, poll=0.1):
+        """Block until the session is ready or timeout seconds pass; returns is_ready()
+
+        Gives up early once the circuit opens, since the gateway is known to be down.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.ready.is_set() and not self.circuit_open():
+            remaining = poll if deadline is None else min(poll, deadline - time.monotonic())
+            if remaining <= 0:
+                break
+            self.ready.wait(remaining)
+        return self.is_ready()
+
+    def describe(self):
+        """One-line summary of the cached status for log output"""
+        if self.last_error:
+            return f"unreachable ({self.last_error})"
+        if self.checked_at is None:
+            return "not checked yet"
+        age = time.time() - self.checked_at
+        flags = ', '.join(f"{key}={self.status.get(key)}" for key in ('authenticated', 'connected', 'competing'))
+        return f"{flags} ({age:.0f}s ago)"
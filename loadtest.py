@@ -0,0 +1,302 @@
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import requests
+import yaml
+
+from gateway import DEFAULT_PACING, GatewayClient, TokenBucket
+
+requests.packages.urllib3.disable_warnings()
+
+"""Concurrency load test for the Client Portal Gateway endpoints the report pipeline uses
+
+By default the load goes to a local stand-in server that answers the summary, trades and
+auth status endpoints with realistic bodies, a bounded worker pool (the gateway's
+conf.yaml workerPoolSize) and optional latency, errors and 429 pacing. Point --target
+at a real gateway only when you mean to.
+"""
+
+STAND_IN_ACCOUNT = "U1234567"  # Used when there is no config.yaml; only the stand-in knows it
+
+def default_account():
+    """account_id from config.yaml if there is one, else the stand-in's placeholder"""
+    if os.path.exists("config.yaml"):
+        with open("config.yaml", "r") as f:
+            return (yaml.safe_load(f) or {}).get("account_id") or STAND_IN_ACCOUNT
+    return STAND_IN_ACCOUNT
+
+def gateway_endpoints(account):
+    """Endpoint name -> path for the given account"""
+    return {
+        'summary': f"/v1/api/iserver/account/{account}/summary",
+        'trades': "/v1/api/iserver/account/trades",
+        'auth': "/v1/api/iserver/auth/status",
+    }
+
+ENDPOINTS = gateway_endpoints(STAND_IN_ACCOUNT)
+
+def stand_in_bodies(account=STAND_IN_ACCOUNT, executions=200, seed=7):
+    """Response bodies shaped like the gateway's, with a day's worth of executions"""
+    endpoints = gateway_endpoints(account)
+    rng = random.Random(seed)
+    trades = [{
+        'execution_id': f"0000e0d5.{i:08x}.01.01",
+        'symbol': f"SYM{i % 40}",
+        'sec_type': 'STK',
+        'side': rng.choice(['B', 'S']),
+        'size': rng.choice([10, 25, 50, 100]),
+        'price': round(rng.uniform(10, 500), 2),
+        'commission': round(rng.uniform(0.3, 1.5), 2),
+        'trade_time': f"20240102-{9 + i * 7 // 3600:02d}:{i * 7 // 60 % 60:02d}:{i * 7 % 60:02d}",
+    } for i in range(executions)]
+    return {
+        endpoints['summary']: {"netLiquidationValue": 125000.0, "accountType": "INDIVIDUAL"},
+        endpoints['trades']: trades,
+        endpoints['auth']: {"authenticated": True, "connected": True, "competing": False},
+    }
+
+
+class StandInGateway:
+    """Local HTTP server imitating the gateway's request handling
+
+    workers bounds how many requests are served at once (extra requests queue, as with
+    workerPoolSize). latency/jitter are seconds of simulated upstream time per request,
+    error_rate answers that fraction with a 500, and pacing answers 429 once an
+    endpoint family exceeds the gateway's documented rate limits.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, workers=20, latency=0.02, jitter=0.01, error_rate=0.0, pacing=False,
+                 account=STAND_IN_ACCOUNT):
+        self.bodies = {path: json.dumps(body).encode('utf-8') for path, body in stand_in_bodies(account).items()}
+        self.pool = threading.BoundedSemaphore(workers)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.limits = {}
+        if pacing:
+            limits = dict(DEFAULT_PACING)
+            limits.pop('global')
+            self.limits = {fragment: TokenBucket(rate, burst) for fragment, (rate, burst) in limits.items()}
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+
+    def _throttled(self, path):
+        for fragment, bucket in self.limits.items():
+            if fragment in path and not bucket.try_acquire():
+                return True
+        return False
+
+    def _handler(self):
+        gateway = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, like the real gateway
+            disable_nagle_algorithm = True  # Headers and body are separate writes; don't wait on delayed ACKs
+
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                with gateway.pool:
+                    time.sleep(max(0.0, random.gauss(gateway.latency, gateway.jitter)))
+                    body = gateway.bodies.get(path)
+                    if body is None:
+                        status, body = 404, b'{"error": "not found"}'
+                    elif gateway._throttled(path):
+                        status, body = 429, b'{"error": "Too Many Requests"}'
+                    elif random.random() < gateway.error_rate:
+                        status, body = 500, b'{"error": "internal error"}'
+                    else:
+                        status = 200
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_POST = do_GET
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name="stand-in-gateway", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class Results:
+    """Latencies and outcomes per endpoint, safe to record from many threads"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.outcomes = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint, latency, outcome):
+        with self.lock:
+            self.latencies[endpoint].append(latency)
+            self.outcomes[endpoint][outcome] += 1
+
+    def rows(self, elapsed):
+        rows = []
+        for endpoint in list(self.latencies) + ['all']:
+            if endpoint == 'all':
+                latencies = np.concatenate([np.array(v) for v in self.latencies.values()]) if self.latencies else np.zeros(0)
+                outcomes = defaultdict(int)
+                for counts in self.outcomes.values():
+                    for outcome, count in counts.items():
+                        outcomes[outcome] += count
+            else:
+                latencies, outcomes = np.array(self.latencies[endpoint]), self.outcomes[endpoint]
+            total = len(latencies)
+            if not total:
+                continue
+            errors = total - outcomes.get('200', 0)
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+            rows.append({
+                'endpoint': endpoint,
+                'requests': total,
+                'errors': errors,
+                'error_rate': errors / total * 100,
+                'throughput': total / elapsed,
+                'p50_ms': p50,
+                'p95_ms': p95,
+                'p99_ms': p99,
+                'max_ms': latencies.max() * 1000,
+                'outcomes': dict(outcomes),
+            })
+        return rows
+
+
+def run_load(target, endpoints, concurrency, duration, rate=None, client='raw', timeout=10, account=STAND_IN_ACCOUNT):
+    """Drive endpoints round robin from concurrency threads for duration seconds
+
+    With rate (requests per second across all threads) requests are sent on a fixed
+    schedule and latency is measured from the scheduled send time, so queueing in an
+    overloaded client or server shows up instead of being hidden; requests still waiting
+    for a free thread at the deadline are counted as unsent. client='gateway' sends
+    through GatewayClient to include its pacing and request coalescing. account goes into
+    the summary path.
+    Returns (rows per endpoint plus 'all', unsent).
+    """
+    results = Results()
+    paths = [gateway_endpoints(account)[name] for name in endpoints]
+    counter = iter(range(10 ** 12))
+    counter_lock = threading.Lock()
+    started = time.perf_counter()
+    deadline = started + duration
+    shared = GatewayClient(target) if client == 'gateway' else None
+
+    def worker():
+        session = requests.Session()
+        session.verify = False
+        while True:
+            with counter_lock:
+                i = next(counter)
+            now = time.perf_counter()
+            scheduled = started + i / rate if rate else now
+            if scheduled >= deadline or now >= deadline:
+                return
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            endpoint = endpoints[i % len(endpoints)]
+            path = paths[i % len(paths)]
+            try:
+                if shared is not None:
+                    shared.get_json(path, timeout=timeout)
+                    outcome = '200'
+                else:
+                    outcome = str(session.get(f"{target}{path}", timeout=timeout).status_code)
+            except requests.HTTPError as e:
+                outcome = str(e.response.status_code)
+            except requests.RequestException as e:
+                outcome = type(e).__name__
+            results.record(endpoint, time.perf_counter() - scheduled, outcome)
+
+    threads = [threading.Thread(target=worker, name=f"load-{n}", daemon=True) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    rows = results.rows(time.perf_counter() - started)
+    sent = rows[-1]['requests'] if rows else 0
+    return rows, max(0, int(rate * duration) - sent) if rate else 0
+
+def print_report(rows, concurrency, rate, unsent=0):
+    print(f"\n📊 Concurrency {concurrency}" + (f", target {rate:g} req/s" if rate else ", unthrottled"))
+    print(f"   {'endpoint':9} {'requests':>8} {'req/s':>8} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for row in rows:
+        print(f"   {row['endpoint']:9} {row['requests']:8} {row['throughput']:8.1f} {row['error_rate']:6.1f}% "
+              f"{row['p50_ms']:8.1f} {row['p95_ms']:8.1f} {row['p99_ms']:8.1f} {row['max_ms']:8.1f}")
+    failures = {outcome: count for outcome, count in rows[-1]['outcomes'].items() if outcome != '200'} if rows else {}
+    if failures:
+        print(f"   ⚠️ Non-200 outcomes: {failures}")
+    if unsent:
+        print(f"   ⚠️ {unsent} scheduled requests were never sent: the clients could not keep up with the rate")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the gateway endpoints used by the report pipeline")
+    parser.add_argument("--target", help="Gateway base URL (default: start a local stand-in server)")
+    parser.add_argument("--endpoints", default="summary,trades,auth",
+                        help=f"Comma separated endpoints out of {', '.join(ENDPOINTS)} (default: %(default)s)")
+    parser.add_argument("--concurrency", default="1,5,10,20,40",
+                        help="Concurrent clients; a comma separated list runs one step per value (default: %(default)s)")
+    parser.add_argument("--rate", type=float, help="Requests per second across all clients (default: as fast as possible)")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per concurrency step (default: %(default)s)")
+    parser.add_argument("--client", choices=['raw', 'gateway'], default='raw',
+                        help="raw requests, or GatewayClient with its pacing and coalescing (default: %(default)s)")
+    parser.add_argument("--account", default=default_account(),
+                        help="Account id in the summary path (default: account_id from config.yaml, if any)")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON as well")
+
+    stand_in = parser.add_argument_group("stand-in server")
+    stand_in.add_argument("--workers", type=int, default=20, help="Requests served at once, like workerPoolSize (default: %(default)s)")
+    stand_in.add_argument("--latency", type=float, default=0.02, help="Seconds of simulated work per request (default: %(default)s)")
+    stand_in.add_argument("--jitter", type=float, default=0.01, help="Standard deviation of that time (default: %(default)s)")
+    stand_in.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with a 500")
+    stand_in.add_argument("--pacing", action="store_true", help="Answer 429 above the gateway's per-endpoint rate limits")
+    args = parser.parse_args()
+
+    endpoints = [name.strip() for name in args.endpoints.split(",") if name.strip()]
+    unknown = [name for name in endpoints if name not in ENDPOINTS]
+    if unknown:
+        parser.error(f"unknown endpoint(s): {', '.join(unknown)}")
+
+    server = None
+    target = args.target
+    if not target:
+        server = StandInGateway(workers=args.workers, latency=args.latency, jitter=args.jitter,
+                                error_rate=args.error_rate, pacing=args.pacing, account=args.account).start()
+        target = server.url
+        print(f"🧪 Stand-in gateway on {target}: {args.workers} workers, {args.latency * 1000:.0f}±{args.jitter * 1000:.0f}ms per request"
+              + (", gateway pacing limits" if args.pacing else "") + (f", {args.error_rate:.0%} errors" if args.error_rate else ""))
+    else:
+        print(f"🔌 Load testing {target} (account {args.account})")
+
+    report = []
+    try:
+        for concurrency in [int(value) for value in args.concurrency.split(",")]:
+            rows, unsent = run_load(target, endpoints, concurrency, args.duration, args.rate, args.client,
+                                    account=args.account)
+            print_report(rows, concurrency, args.rate, unsent)
+            report.append({'concurrency': concurrency, 'rate': args.rate, 'unsent': unsent, 'results': rows})
+    finally:
+        if server is not None:
+            server.stop()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
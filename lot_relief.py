@@ -0,0 +1,131 @@
+import heapq
+from collections import deque
+
+"""Lot relief policies: which open lots a closing execution is matched against"""
+
+def lot_size(lot):
+    return float(lot.get('size', 0))
+
+def split_lot(lot, matched_qty):
+    """Return what is left of a lot after matched_qty of it has been closed"""
+    size = lot_size(lot)
+    remaining = dict(lot)
+    remaining['size'] = size - matched_qty
+    remaining['net_amount'] = float(lot.get('net_amount', 0)) * (remaining['size'] / size)
+    return remaining
+
+
+class FifoLots:
+    """First in, first out: relieve the oldest open lot (deque, O(1) per fill)"""
+
+    def __init__(self):
+        self.lots = deque()
+
+    def __len__(self):
+        return len(self.lots)
+
+    def add(self, lot):
+        self.lots.append(lot)
+
+    def take(self, qty):
+        """Close up to qty against the next lot; returns (lot, matched_qty)"""
+        lot = self.lots.popleft()
+        matched_qty = min(lot_size(lot), qty)
+        if lot_size(lot) > matched_qty:
+            self.lots.appendleft(split_lot(lot, matched_qty))
+        return lot, matched_qty
+
+    def open_lots(self):
+        return list(self.lots)
+
+
+class LifoLots(FifoLots):
+    """Last in, first out: relieve the newest open lot (stack, O(1) per fill)"""
+
+    def __init__(self):
+        self.lots = []
+
+    def take(self, qty):
+        lot = self.lots.pop()
+        matched_qty = min(lot_size(lot), qty)
+        if lot_size(lot) > matched_qty:
+            self.lots.append(split_lot(lot, matched_qty))
+        return lot, matched_qty
+
+
+class HifoLots:
+    """Highest in, first out: relieve the most expensive open lot (heap, O(log n) per fill)"""
+
+    def __init__(self):
+        self.heap = []
+        self.seq = 0  # Ties on price fall back to arrival order
+
+    def __len__(self):
+        return len(self.heap)
+
+    def add(self, lot):
+        heapq.heappush(self.heap, (-float(lot.get('price', 0)), self.seq, lot))
+        self.seq += 1
+
+    def take(self, qty):
+        neg_price, seq, lot = heapq.heappop(self.heap)
+        matched_qty = min(lot_size(lot), qty)
+        if lot_size(lot) > matched_qty:
+            # Same price and sequence, so the remainder keeps its place in the heap
+            heapq.heappush(self.heap, (neg_price, seq, split_lot(lot, matched_qty)))
+        return lot, matched_qty
+
+    def open_lots(self):
+        return [lot for _, _, lot in sorted(self.heap, key=lambda entry: entry[1])]
+
+
+class AverageCostLots(FifoLots):
+    """Average cost: every close is priced at the running average of the open lots (O(1) per fill)
+
+    Lots are still drawn down oldest first so open dates stay meaningful, but the
+    price on each relieved lot is the running total cost divided by open quantity.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.total_qty = 0.0
+        self.total_cost = 0.0
+
+    def average_price(self):
+        return self.total_cost / self.total_qty if self.total_qty > 0 else 0.0
+
+    def add(self, lot):
+        super().add(lot)
+        self.total_qty += lot_size(lot)
+        self.total_cost += lot_size(lot) * float(lot.get('price', 0))
+
+    def take(self, qty):
+        average = self.average_price()
+        lot, matched_qty = super().take(qty)
+        self.total_qty -= matched_qty
+        self.total_cost -= matched_qty * average
+        if self.total_qty <= 0:
+            self.total_qty = self.total_cost = 0.0
+
+        relieved = dict(lot)
+        relieved['price'] = average
+        return relieved, matched_qty
+
+    def open_lots(self):
+        average = self.average_price()
+        return [dict(lot, price=average) for lot in self.lots]
+
+
+LOT_METHODS = {
+    'fifo': FifoLots,
+    'lifo': LifoLots,
+    'hifo': HifoLots,
+    'average': AverageCostLots,
+}
+
+def make_lot_book(method='fifo'):
+    """Create an empty open-lot book for the given relief method"""
+    try:
+        return LOT_METHODS[method.lower()]()
+    except KeyError:
+        raise ValueError(f"Unknown lot relief method '{method}' (choose from {', '.join(LOT_METHODS)})")
@@ -0,0 +1,99 @@
+import sqlite3
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+"""Net liquidation value over time, so Account % uses the account size when a trade closed"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS net_liq (
+    account TEXT NOT NULL,
+    as_of TEXT NOT NULL,          -- 'YYYY-MM-DD HH:MM:SS', UTC like the trade times
+    nlv REAL NOT NULL,
+    source TEXT NOT NULL,         -- 'snapshot' (a run) or 'backfill' (Portfolio Analyst)
+    PRIMARY KEY (account, as_of)
+) WITHOUT ROWID;
+"""
+
+# Portfolio Analyst reports one NAV per day; treat it as that day's closing value
+BACKFILL_TIME = "23:59:59"
+
+def parse_performance(data, account):
+    """(date, nav) pairs for account from a /pa/performance response"""
+    nav = (data or {}).get('nav') or {}
+    entries = nav.get('data') or []
+    entry = next((e for e in entries if e.get('id') == account), entries[0] if entries else {})
+    dates = entry.get('dates') or nav.get('dates') or []
+    return [(date, value) for date, value in zip(dates, entry.get('navs') or []) if value is not None]
+
+def account_pct(net_pnl, close_times, net_liq, net_liq_at=None):
+    """P&L as a percentage of the account, against historical net liq when net_liq_at is given"""
+    if net_liq_at is None:
+        return (net_pnl / net_liq * 100).round(4) if net_liq > 0 else 0.0
+    denominator = pd.Series(net_liq_at(close_times), index=net_pnl.index)
+    return (net_pnl / denominator.where(denominator > 0) * 100).fillna(0.0).round(4)
+
+
+class NetLiqHistory:
+    """Net liquidation snapshots and backfilled daily NAVs in SQLite, keyed by (account, time)
+
+    series() reads an account's history once into sorted numpy arrays and keeps it until
+    the next write, and at() resolves any number of timestamps with one searchsorted.
+    """
+
+    def __init__(self, path="trades.db"):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+        self._series = {}
+
+    def close(self):
+        self.conn.close()
+
+    def record(self, account, nlv, as_of=None):
+        """Store the current net liquidation value as a snapshot"""
+        as_of = (as_of or datetime.now(timezone.utc).replace(tzinfo=None)).isoformat(' ', 'seconds')
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO net_liq VALUES (?, ?, ?, 'snapshot')", (account, as_of, float(nlv)))
+        self._series.pop(account, None)
+
+    def backfill(self, account, daily_navs):
+        """Bulk insert (YYYYMMDD, nav) pairs; snapshots already stored for the same time win"""
+        rows = [(account, f"{date[:4]}-{date[4:6]}-{date[6:8]} {BACKFILL_TIME}", float(nav), 'backfill')
+                for date, nav in daily_navs]
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany("INSERT OR IGNORE INTO net_liq VALUES (?, ?, ?, ?)", rows)
+            added = self.conn.total_changes - before
+        self._series.pop(account, None)
+        return added
+
+    def series(self, account):
+        """(times as datetime64[s], nlv) arrays for account, oldest first"""
+        if account not in self._series:
+            rows = self.conn.execute("SELECT as_of, nlv FROM net_liq WHERE account = ? ORDER BY as_of",
+                                     (account,)).fetchall()
+            times = np.array([row[0] for row in rows], dtype='datetime64[s]')
+            values = np.array([row[1] for row in rows], dtype='float64')
+            self._series[account] = (times, values)
+        return self._series[account]
+
+    def at(self, account, times, default=0.0):
+        """Net liquidation value as of each timestamp: the latest one at or before it
+
+        Timestamps before the first stored value fall back to the earliest value, and to
+        default when the account has no history at all.
+        """
+        history_times, values = self.series(account)
+        times = pd.to_datetime(pd.Series(times)).to_numpy(dtype='datetime64[s]')
+        if not len(values):
+            return np.full(len(times), float(default))
+        positions = np.searchsorted(history_times, times, side='right') - 1
+        return values[np.clip(positions, 0, None)]
+
+    def describe(self, account):
+        times, values = self.series(account)
+        if not len(values):
+            return "no net liquidation history"
+        return f"{len(values)} values from {str(times[0])[:10]} to {str(times[-1])[:10]}"
@@ -0,0 +1,105 @@
+import argparse
+import os
+import time
+
+import pandas as pd
+import yaml
+
+from trade_db import TradeDB
+
+"""Run named or ad hoc SQL against the trade history database
+
+    python query.py --list
+    python query.py pnl_by_weekday_short_options
+    python query.py --sql "SELECT instrument, SUM(net_pnl) FROM round_trips GROUP BY 1 ORDER BY 2 LIMIT 10"
+"""
+
+NAMED_QUERIES = {
+    'pnl_by_weekday_short_options': (
+        "P&L by close weekday for options held under 1 day",
+        """
+        SELECT CASE strftime('%w', close_time)
+                   WHEN '0' THEN 'Sun' WHEN '1' THEN 'Mon' WHEN '2' THEN 'Tue' WHEN '3' THEN 'Wed'
+                   WHEN '4' THEN 'Thu' WHEN '5' THEN 'Fri' ELSE 'Sat' END AS weekday,
+               COUNT(*) AS trades,
+               ROUND(SUM(net_pnl), 2) AS net_pnl,
+               ROUND(AVG(net_pnl), 2) AS avg_pnl,
+               ROUND(100.0 * SUM(net_pnl > 0) / COUNT(*), 1) AS win_rate
+        FROM round_trips
+        WHERE sec_type = 'OPT' AND holding_seconds < 86400
+        GROUP BY strftime('%w', close_time)
+        ORDER BY strftime('%w', close_time)
+        """),
+    # Dashboards sum the incrementally kept rollups rather than every round trip
+    'daily_dashboard': (
+        "Trades, P&L, commission and win rate per close day (last 30 days with trades)",
+        lambda db: last_rows(db.rollup('day'), 30)),
+    'weekly_dashboard': (
+        "Trades, P&L, commission and win rate per week (Monday start)",
+        lambda db: db.rollup('week')),
+    'pnl_by_month': (
+        "Net P&L, trade count and commission per close month",
+        lambda db: db.rollup('month')),
+    'pnl_by_instrument': (
+        "Best and worst instruments by total net P&L",
+        lambda db: db.rollup(None, by=('instrument', 'sec_type'), order_by='net_pnl DESC')),
+    'win_rate_by_sec_type': (
+        "Win rate and average winner/loser per security type and direction",
+        """
+        SELECT sec_type, direction, COUNT(*) AS trades,
+               ROUND(100.0 * SUM(net_pnl > 0) / COUNT(*), 1) AS win_rate,
+               ROUND(AVG(CASE WHEN net_pnl > 0 THEN net_pnl END), 2) AS avg_win,
+               ROUND(AVG(CASE WHEN net_pnl < 0 THEN net_pnl END), 2) AS avg_loss
+        FROM round_trips GROUP BY sec_type, direction ORDER BY sec_type, direction
+        """),
+    'open_exposure': (
+        "Open lots summed per instrument",
+        """
+        SELECT instrument, sec_type, side, SUM(quantity) AS quantity,
+               ROUND(SUM(quantity * price * CASE WHEN sec_type = 'OPT' THEN 100 ELSE 1 END), 2) AS sizing,
+               MIN(open_time) AS oldest
+        FROM open_lots GROUP BY instrument, sec_type, side ORDER BY sizing DESC
+        """),
+}
+
+def last_rows(result, count):
+    columns, rows = result
+    return columns, rows[-count:]
+
+def default_db_path():
+    """trade_db from config.yaml if there is one, else trades.db"""
+    if os.path.exists("config.yaml"):
+        with open("config.yaml", "r") as f:
+            return (yaml.safe_load(f) or {}).get("trade_db") or "trades.db"
+    return "trades.db"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the IBKR trade history database")
+    parser.add_argument("name", nargs="?", choices=list(NAMED_QUERIES), help="Named query to run")
+    parser.add_argument("--sql", help="Ad hoc SQL to run instead of a named query")
+    parser.add_argument("--list", action="store_true", help="List the named queries")
+    parser.add_argument("--db", default=None, help="Database file (default: trade_db from config.yaml)")
+    parser.add_argument("--limit", type=int, default=50, help="Rows to print (default: %(default)s)")
+    args = parser.parse_args()
+
+    if args.list or not (args.name or args.sql):
+        print("📚 Named queries:")
+        for name, (description, _) in NAMED_QUERIES.items():
+            print(f"   {name:32} {description}")
+        raise SystemExit(0)
+
+    db_path = args.db or default_db_path()
+    if not os.path.exists(db_path):
+        raise SystemExit(f"❌ {db_path} does not exist yet; run generator.py first")
+
+    db = TradeDB(db_path)
+    query = args.sql or NAMED_QUERIES[args.name][1]  # SQL text, or a function of the database
+
+    started = time.perf_counter()
+    columns, rows = query(db) if callable(query) else db.query(query)
+    elapsed = (time.perf_counter() - started) * 1000
+
+    with pd.option_context('display.max_rows', args.limit, 'display.width', 200):
+        print(pd.DataFrame(rows[:args.limit], columns=columns).to_string(index=False))
+    print(f"\n⏱️ {len(rows)} rows in {elapsed:.1f} ms")
+    db.close()
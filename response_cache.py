@@ -0,0 +1,80 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+class CacheMiss(Exception):
+    """Raised in offline mode when a request has never been cached"""
+
+
+class ResponseCache:
+    """Content-addressed on-disk cache for gateway responses (GET, and read-only POSTs keyed on their body)
+
+    Each response is stored as <sha256 of endpoint + params>.json, alongside the endpoint,
+    params and fetch time so the files double as readable test/benchmark fixtures.
+
+    ttls maps an endpoint fragment (e.g. 'summary', 'trades') to seconds; the first
+    fragment found in the endpoint wins, otherwise default_ttl applies. offline replays
+    whatever is cached regardless of age and never goes to the network. record always
+    fetches fresh but writes every response, which is how fixtures are captured.
+    """
+
+    def __init__(self, directory=".ibkr_cache", ttls=None, default_ttl=0, offline=False, record=False):
+        self.directory = directory
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self.offline = offline
+        self.record = record
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(endpoint, params=None):
+        payload = json.dumps({'endpoint': endpoint, 'params': params or {}}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def path(self, endpoint, params=None):
+        return os.path.join(self.directory, f"{self.key(endpoint, params)}.json")
+
+    def ttl(self, endpoint):
+        for fragment, seconds in self.ttls.items():
+            if fragment in endpoint:
+                return seconds
+        return self.default_ttl
+
+    def get(self, endpoint, params=None):
+        """Return the cached body if it is fresh enough (or we are offline), else None"""
+        path = self.path(endpoint, params)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            entry = None
+
+        if entry is not None and not self.record:
+            age = time.time() - entry.get('fetched_at', 0)
+            if self.offline or age <= self.ttl(endpoint):
+                self.hits += 1
+                return entry['body']
+
+        self.misses += 1
+        if self.offline:
+            raise CacheMiss(f"No cached response for {endpoint} {params or ''} in {self.directory}")
+        return None
+
+    def put(self, endpoint, params, body):
+        """Store a response; written to a temp file and renamed so readers never see half a file"""
+        if self.offline or (not self.record and self.ttl(endpoint) <= 0):
+            return
+
+        entry = {'endpoint': endpoint, 'params': params or {}, 'fetched_at': time.time(), 'body': body}
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self.path(endpoint, params))
+        except Exception:
+            os.unlink(tmp_path)
+            raise
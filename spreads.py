@@ -0,0 +1,184 @@
+from itertools import groupby
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+
+from nlv_history import account_pct
+
+"""Group option round trips that were opened together into multi-leg strategies
+
+Each option leg is keyed by its underlying symbol and expiry (from contract_description_2).
+Legs are sorted by (symbol, expiry, open time) once and swept in order: a new spread
+starts whenever the key changes or the gap to the previous leg's open exceeds the
+window, so grouping is a sort plus a cumulative sum, never an all-pairs comparison.
+"""
+
+SPREAD_COLUMNS = ["symbol", "expiry", "strike", "right", "direction", "quantity", "open_date", "close_date",
+                  "sizing", "gross_pnl", "net_pnl", "commission"]
+
+def option_legs(matched_trades):
+    """Option round trips from the matcher as a typed frame of legs"""
+    trips = [m for m in matched_trades if m and m['sec_type'] == 'OPT']
+
+    def column(key):
+        return [m[key] for m in trips]
+
+    def contract(key):
+        return pd.Series([m['buy_trade'].get(key) or '' for m in trips], dtype=object)
+
+    # "Sep19 '25 95 Call" -> expiry "Sep19 '25", strike 95
+    parts = contract('contract_description_2').str.extract(r"^(\S+ \S+) (\S+)")
+    return pd.DataFrame({
+        "symbol": contract('symbol'),
+        "expiry": parts[0].fillna(''),
+        "strike": pd.to_numeric(parts[1], errors='coerce'),
+        "right": contract('put_or_call'),
+        "direction": pd.Series(column('direction'), dtype=object),
+        "quantity": pd.Series(column('quantity'), dtype='float64'),
+        "open_date": pd.to_datetime(pd.Series(column('open_date'), dtype=object)),
+        "close_date": pd.to_datetime(pd.Series(column('close_date'), dtype=object)),
+        "sizing": pd.Series(column('sizing'), dtype='float64'),
+        "gross_pnl": pd.Series(column('gross_pnl'), dtype='float64'),
+        "net_pnl": pd.Series(column('net_pnl'), dtype='float64'),
+        "commission": pd.Series(column('total_commission'), dtype='float64'),
+    }, columns=SPREAD_COLUMNS)
+
+def assign_spread_ids(legs, window=60):
+    """Sort legs and number the spreads: same symbol and expiry, opened within window seconds of the previous leg"""
+    legs = legs.sort_values(["symbol", "expiry", "open_date"], kind='stable').reset_index(drop=True)
+    same_book = legs['symbol'].eq(legs['symbol'].shift()) & legs['expiry'].eq(legs['expiry'].shift())
+    gap = legs['open_date'].diff().dt.total_seconds()
+    legs['spread_id'] = (~(same_book & (gap <= window))).cumsum() - 1
+    return legs
+
+def spread_shapes(contracts):
+    """Per spread features classify() needs, from distinct contracts sorted by (spread, strike, right)
+
+    sign0..sign3 and qty0..qty3 are the direction (+1 bought, -1 sold) and total
+    quantity of the first four contracts in strike order; missing legs are NaN.
+    """
+    spread = contracts['spread_id']
+    sign = contracts['direction'].map({'LONG': 1.0, 'SHORT': -1.0}).fillna(0.0)
+    is_call = contracts['right'].eq('C')
+    is_put = contracts['right'].eq('P')
+    position = contracts.groupby('spread_id').cumcount()
+
+    shapes = pd.DataFrame({
+        'legs': spread.value_counts(sort=False).sort_index(),
+        'calls': is_call.groupby(spread).sum(),
+        'puts': is_put.groupby(spread).sum(),
+        'strikes': contracts.groupby('spread_id')['strike'].nunique(),
+        'longs': sign.gt(0).groupby(spread).sum(),
+        'shorts': sign.lt(0).groupby(spread).sum(),
+        'call_longs': (is_call & sign.gt(0)).groupby(spread).sum(),
+        'call_shorts': (is_call & sign.lt(0)).groupby(spread).sum(),
+        'put_longs': (is_put & sign.gt(0)).groupby(spread).sum(),
+        'put_shorts': (is_put & sign.lt(0)).groupby(spread).sum(),
+        'top_put': contracts['strike'].where(is_put).groupby(spread).max(),
+        'bottom_call': contracts['strike'].where(is_call).groupby(spread).min(),
+    })
+    for name, values in (('sign', sign), ('qty', contracts['quantity'])):
+        wide = values.groupby([spread, position]).first().unstack().reindex(columns=range(4))
+        for i in range(4):
+            shapes[f"{name}{i}"] = wide[i]
+    return shapes
+
+def classify(shapes):
+    """Strategy name from the shape of the distinct legs (spread_shapes() rows, one per spread)
+
+    A name is only given when the legs have that strategy's structure, bought and sold
+    legs included; anything else is an N-Leg Combo.
+    """
+    legs, calls, puts, strikes = (shapes[col].to_numpy() for col in ('legs', 'calls', 'puts', 'strikes'))
+    longs, shorts = shapes['longs'].to_numpy(), shapes['shorts'].to_numpy()
+    s0, s1, s2, s3 = (shapes[f"sign{i}"].to_numpy() for i in range(4))
+    q0, q1, q2, q3 = (shapes[f"qty{i}"].to_numpy() for i in range(4))
+
+    same_right = (calls == legs) | (puts == legs)
+    both_rights = (calls > 0) & (puts > 0)
+    one_side = (longs == legs) | (shorts == legs)  # Every leg bought, or every leg sold
+    # Outer legs one way, inner legs the other, equal size (condors and iron structures)
+    wings = (s0 == s3) & (s1 == s2) & (s0 == -s1) & (q0 == q1) & (q1 == q2) & (q2 == q3)
+    # A bought and a sold put below (or at) a bought and a sold call
+    iron = ((calls == 2) & (puts == 2)
+            & (shapes['call_longs'].to_numpy() == 1) & (shapes['call_shorts'].to_numpy() == 1)
+            & (shapes['put_longs'].to_numpy() == 1) & (shapes['put_shorts'].to_numpy() == 1)
+            & (shapes['top_put'].to_numpy() <= shapes['bottom_call'].to_numpy()))
+    names = np.select(
+        [
+            legs == 1,
+            (legs == 2) & same_right & (s0 == -s1),
+            (legs == 2) & both_rights & one_side & (strikes == 1),
+            (legs == 2) & both_rights & one_side & (strikes == 2),
+            (legs == 3) & same_right & (s0 == s2) & (s1 == -s0) & (q1 == 2 * q0) & (q2 == q0),  # 1:2:1
+            (legs == 4) & iron & wings & (strikes == 3),
+            (legs == 4) & iron & wings & (strikes == 4),
+            (legs == 4) & same_right & wings & (strikes == 4),
+        ],
+        ["Single", "Vertical", "Straddle", "Strangle", "Butterfly", "Iron Butterfly", "Iron Condor", "Condor"],
+        default="",
+    )
+    return np.where(names == "", pd.Series(legs).astype(int).astype(str).to_numpy() + "-Leg Combo", names)
+
+def group_spreads(legs, window=60, net_liq=0.0, min_legs=2, net_liq_at=None, max_size_per_trade=1000):
+    """Combine option legs into one row per spread with combined P&L
+
+    Only spreads with at least min_legs distinct contracts are returned; single legs
+    already appear in the regular trade log. The % columns follow the trade log:
+    Per Trade % is P&L over sizing, Net Trade % is P&L over max_size_per_trade.
+    """
+    if legs.empty:
+        return pd.DataFrame()
+
+    legs = assign_spread_ids(legs, window)
+
+    # Distinct contracts per spread, e.g. partial fills of the same strike count once with their quantities summed
+    contracts = (legs.groupby(["spread_id", "strike", "right"], sort=True, dropna=False)
+                 .agg(direction=('direction', 'first'), quantity=('quantity', 'sum')).reset_index())
+    shapes = spread_shapes(contracts)
+    leg_count = shapes['legs']
+
+    keep = leg_count.index[leg_count >= min_legs]
+    if keep.empty:
+        return pd.DataFrame()
+    legs = legs[legs['spread_id'].isin(keep)]
+    contracts = contracts[contracts['spread_id'].isin(keep)]
+
+    spreads = legs.groupby('spread_id', sort=True).agg(
+        symbol=('symbol', 'first'),
+        expiry=('expiry', 'first'),
+        open_date=('open_date', 'min'),
+        close_date=('close_date', 'max'),
+        sizing=('sizing', 'sum'),
+        gross_pnl=('gross_pnl', 'sum'),
+        net_pnl=('net_pnl', 'sum'),
+        commission=('commission', 'sum'),
+    )
+
+    # "+400P -405P -420C +425C": long or short, strike and right of every distinct contract
+    labels = (contracts['direction'].map({'LONG': '+', 'SHORT': '-'}).fillna('')
+              + contracts['strike'].map('{:g}'.format) + contracts['right'])
+    # contracts is sorted by spread, so one sweep joins each run of labels
+    leg_labels = pd.Series({spread_id: ' '.join(label for _, label in run)
+                            for spread_id, run in groupby(zip(contracts['spread_id'].tolist(), labels.tolist()),
+                                                          key=itemgetter(0))})
+    strategy = classify(shapes.loc[keep])
+
+    df = pd.DataFrame({
+        "TRADE": spreads['symbol'] + " " + spreads['expiry'] + " " + leg_labels,
+        "Strategy": strategy,
+        "Legs": leg_count[keep],
+        "DATE (OPEN)": spreads['open_date'],
+        "DATE (CLOSE)": spreads['close_date'],
+        "DURATION": (spreads['close_date'] - spreads['open_date']).dt.days,
+        "Commission": spreads['commission'],
+        "Sizing": spreads['sizing'].round(2),
+        "Gross P&L": spreads['gross_pnl'].round(2),
+        "OUTCOME": spreads['net_pnl'].round(2),
+        "Per Trade % Gain/Loss": (spreads['net_pnl'] / spreads['sizing'].where(spreads['sizing'] > 0) * 100).fillna(0).round(2),
+        "Net Trade % Gain/Loss": (spreads['net_pnl'] / max_size_per_trade * 100).round(2),
+    })
+    df = df.reset_index(drop=True)
+    df["Account % Gain/Loss"] = account_pct(df["OUTCOME"], df["DATE (CLOSE)"], net_liq, net_liq_at)
+    return df
@@ -0,0 +1,37 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# generator.py reads config.yaml from the working directory when it is imported
+WORKDIR = tempfile.mkdtemp(prefix="ibkr-journal-tests-")
+with open(os.path.join(WORKDIR, "config.yaml"), "w", encoding="utf-8") as f:
+    f.write("account_id: 'U1234567'\n")
+os.chdir(WORKDIR)
+
+
+@pytest.fixture
+def execution():
+    """Factory for executions in the /iserver/account/trades format"""
+    counter = iter(range(10 ** 6))
+
+    def make(symbol, side, size, price, trade_time, sec_type='STK', commission=1.0, **extra):
+        trade = {
+            'execution_id': f"test.{next(counter):06d}",
+            'symbol': symbol,
+            'sec_type': sec_type,
+            'side': side,
+            'size': size,
+            'price': price,
+            'commission': commission,
+            'net_amount': size * price * (100 if sec_type == 'OPT' else 1),
+            'trade_time': trade_time,
+        }
+        trade.update(extra)
+        return trade
+
+    return make
@@ -0,0 +1,31 @@
+import math
+
+import pandas as pd
+
+from equity_curve import build_curve, unrealized_pnl
+
+
+def test_dense_curve_carries_pnl_through_quiet_buckets():
+    buckets = pd.DataFrame({'bucket': ["2024-01-02 10:00:00", "2024-01-02 13:00:00"], 'trades': [1, 2], 'net_pnl': [50.0, -20.0]})
+    assert len(build_curve(buckets, 0.0)) == 2
+
+    curve = build_curve(buckets, 0.0, dense=True, granularity='1h')
+    assert curve['Trades'].tolist() == [1, 0, 0, 2]
+    assert curve['Cumulative P&L'].tolist() == [50.0, 50.0, 50.0, 30.0]
+
+def test_open_lots_are_marked_only_after_they_traded_again(execution):
+    opened = execution('AAPL', 'B', 10, 100.0, "20240102-15:00:00")
+    assert unrealized_pnl([opened], [opened]) == (None, 1)
+
+    later = execution('AAPL', 'S', 4, 104.5, "20240103-15:00:00")
+    still_open = dict(opened, size=6)
+    assert unrealized_pnl([still_open], [opened, later]) == (27.0, 0)
+
+    short = execution('MSFT', 'S', 5, 300.0, "20240103-16:00:00")
+    assert unrealized_pnl([still_open, short], [opened, later, short]) == (27.0, 1)
+
+def test_unmarked_curve_leaves_unrealized_empty():
+    buckets = pd.DataFrame({'bucket': ["2024-01-02 10:00:00"], 'trades': [1], 'net_pnl': [50.0]})
+    curve = build_curve(buckets, None)
+    assert math.isnan(curve['Unrealized P&L'].iloc[-1])
+    assert curve['Equity'].tolist() == [50.0]
@@ -0,0 +1,66 @@
+import os
+from datetime import datetime
+
+import generator
+from exec_journal import HEADER_SIZE, RECORD_DTYPE, ExecutionJournal
+from trade_db import TradeDB
+
+
+def test_journal_replay_keeps_round_trip_identity(tmp_path, execution):
+    trades = [execution('AAPL', 'B', 10, 100.0, "20240102-15:00:00"),
+              execution('AAPL', 'S', 4, 110.0, "20240103-15:00:00"),
+              execution('AAPL', 'S', 6, 90.0, "20240104-15:00:00")]
+    journal = ExecutionJournal(str(tmp_path / "executions.bin"))
+    assert journal.append(trades) == 3
+    db = TradeDB(str(tmp_path / "trades.db"))
+
+    matched, unmatched = generator.match_buy_sell_pairs(trades)
+    assert db.sync('U1', matched, unmatched, since=datetime(2024, 1, 2)) == (2, 0)
+
+    # A --from-journal run over the same executions must not churn the round trips
+    matched, unmatched = generator.match_buy_sell_pairs(journal.executions())
+    assert db.sync('U1', matched, unmatched) == (0, 0)
+
+def test_append_drops_a_partial_record(tmp_path, execution):
+    path = str(tmp_path / "executions.bin")
+    journal = ExecutionJournal(path)
+    journal.append([execution('AAPL', 'B', 10, 100.0, "20240102-15:00:00")])
+    with open(path, "ab") as f:
+        f.write(b"\x01" * (RECORD_DTYPE.itemsize // 2))  # A write cut short by a crash
+
+    journal.append([execution('MSFT', 'S', 5, 300.0, "20240103-15:00:00")])
+    assert os.path.getsize(path) == HEADER_SIZE + 2 * RECORD_DTYPE.itemsize
+    assert [(row['symbol'], row['side'], row['size']) for row in ExecutionJournal(path).executions()] == \
+        [('AAPL', 'B', 10.0), ('MSFT', 'S', 5.0)]
+
+def test_two_writers_keep_instruments_and_hashes_in_step(tmp_path, execution):
+    path = str(tmp_path / "executions.bin")
+    a, b = ExecutionJournal(path), ExecutionJournal(path)
+    msft = execution('MSFT', 'S', 5, 300.0, "20240103-15:00:00")
+
+    a.append([execution('AAPL', 'B', 10, 100.0, "20240102-15:00:00")])
+    b.append([msft])
+    assert a.append([execution('TSLA', 'B', 2, 200.0, "20240104-15:00:00"), msft]) == 1
+
+    assert [(row['symbol'], row['size']) for row in ExecutionJournal(path).executions()] == \
+        [('AAPL', 10.0), ('MSFT', 5.0), ('TSLA', 2.0)]
+
+def _append_symbol(args):
+    path, symbol = args
+    journal = ExecutionJournal(path)
+    for i in range(20):
+        journal.append([{'execution_id': f"{symbol}.{i}", 'symbol': symbol, 'sec_type': 'STK', 'side': 'B',
+                         'size': i + 1, 'price': 10.0, 'trade_time': f"20240102-15:00:{i:02d}"}])
+
+def test_concurrent_processes_append_safely(tmp_path):
+    from concurrent.futures import ProcessPoolExecutor
+
+    path = str(tmp_path / "executions.bin")
+    symbols = ['AAPL', 'MSFT', 'TSLA', 'NVDA']
+    with ProcessPoolExecutor(max_workers=len(symbols)) as pool:
+        list(pool.map(_append_symbol, [(path, symbol) for symbol in symbols]))
+
+    rows = ExecutionJournal(path).executions()
+    assert len(rows) == 80
+    for symbol in symbols:
+        assert sorted(row['size'] for row in rows if row['symbol'] == symbol) == [float(i + 1) for i in range(20)]
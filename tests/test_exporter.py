@@ -0,0 +1,22 @@
+import os
+import stat
+
+from exporter import DEFAULT_MODE, atomic_write
+
+
+def test_atomic_write_uses_the_umask_default_mode(tmp_path):
+    path = str(tmp_path / "report.csv")
+    umask = os.umask(0o022)
+    os.umask(umask)
+
+    atomic_write(path, lambda tmp_path: open(tmp_path, "w").write("a,b\n"))
+
+    assert DEFAULT_MODE == 0o666 & ~umask
+    assert stat.S_IMODE(os.stat(path).st_mode) == DEFAULT_MODE
+    assert os.listdir(tmp_path) == ["report.csv"]
+
+def test_atomic_write_leaves_the_process_umask_alone(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(os, "umask", lambda mask: calls.append(mask) or 0o022)
+    atomic_write(str(tmp_path / "report.csv"), lambda tmp_path: open(tmp_path, "w").write("a,b\n"))
+    assert calls == []
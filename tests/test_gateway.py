@@ -0,0 +1,76 @@
+import json
+import threading
+import time
+
+import pytest
+import requests
+
+from gateway import GatewayClient, TokenBucket
+from keepalive import SessionKeepalive
+from loadtest import ENDPOINTS, StandInGateway
+
+
+@pytest.fixture
+def stand_in():
+    server = StandInGateway(latency=0.05, jitter=0.0).start()
+    yield server
+    server.stop()
+
+def test_concurrent_callers_are_counted_once_each(stand_in):
+    client = GatewayClient(stand_in.url, pacing={'global': (1000, 1000), '/summary': (1000, 1000)})
+    calls = 64
+    threads = [threading.Thread(target=client.get_json, args=(ENDPOINTS['summary'],)) for _ in range(calls)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    summary = client.metrics()['/summary']
+    assert summary['requests'] + summary['coalesced'] == calls
+    assert summary['coalesced'] > 0
+
+def test_keepalive_checks_go_through_the_gateway_client(stand_in):
+    stand_in.bodies['/v1/api/tickle'] = json.dumps({"session": "abc", "iserver": {}}).encode('utf-8')
+    client = GatewayClient(stand_in.url)
+    keepalive = SessionKeepalive(client)
+
+    assert keepalive.check()
+    metrics = client.metrics()
+    assert metrics['/tickle']['requests'] == 1
+    assert metrics['/iserver/auth/status']['requests'] == 1  # No authStatus in the tickle, so it falls back
+
+def test_keepalive_check_stays_within_its_timeout(stand_in):
+    stand_in.bodies['/v1/api/tickle'] = json.dumps({"session": "abc", "iserver": {}}).encode('utf-8')
+    stand_in.latency = 0.6  # Tickle and auth status fallback would take 1.2s in total
+    keepalive = SessionKeepalive(GatewayClient(stand_in.url), timeout=1)
+
+    started = time.monotonic()
+    assert not keepalive.check()
+    assert time.monotonic() - started < 1.3
+    assert keepalive.last_error
+
+def test_try_acquire_never_waits():
+    bucket = TokenBucket(rate=1, burst=2)
+    assert bucket.try_acquire()
+    assert bucket.try_acquire()
+    started = time.monotonic()
+    assert not bucket.try_acquire()
+    assert time.monotonic() - started < 0.1
+
+def test_stand_in_answers_429_above_the_pacing_limits():
+    server = StandInGateway(latency=0.0, jitter=0.0, pacing=True).start()
+    try:
+        statuses = [requests.get(server.url + ENDPOINTS['trades'], timeout=5).status_code for _ in range(3)]
+    finally:
+        server.stop()
+    assert statuses == [200, 429, 429]  # One trades request every 5 seconds
+
+def test_load_test_uses_the_given_account():
+    from loadtest import run_load
+
+    server = StandInGateway(latency=0.0, jitter=0.0, account='U7654321').start()
+    try:
+        rows, _ = run_load(server.url, ['summary'], concurrency=1, duration=0.2, account='U7654321')
+    finally:
+        server.stop()
+    assert rows[-1]['outcomes'] == {'200': rows[-1]['requests']}
@@ -0,0 +1,88 @@
+import pytest
+
+import generator
+from benchmark import make_executions
+from lot_relief import LOT_METHODS
+
+
+@pytest.fixture(scope="module")
+def executions():
+    return make_executions(3000, 60)
+
+@pytest.mark.parametrize("lot_method", list(LOT_METHODS))
+def test_parallel_matches_serial(executions, lot_method):
+    serial = generator.match_buy_sell_pairs(executions, lot_method)
+    parallel = generator.match_buy_sell_pairs_parallel(executions, 3, lot_method)
+    assert parallel == serial
+
+@pytest.mark.parametrize("workers", [2, 7, 64])
+def test_parallel_matches_serial_for_any_worker_count(executions, workers):
+    # More workers than instruments, and an uneven split, shard differently but merge the same
+    assert generator.match_buy_sell_pairs_parallel(executions, workers) == generator.match_buy_sell_pairs(executions)
+
+def test_parallel_with_one_instrument_matches_serial(executions):
+    instrument = generator.parse_instrument_name(executions[0])
+    one = [trade for trade in executions if generator.parse_instrument_name(trade) == instrument]
+    assert generator.match_buy_sell_pairs_parallel(one, 4) == generator.match_buy_sell_pairs(one)
+
+def trips(matched):
+    return [(m['direction'], m['quantity'], m['buy_price'], m['sell_price']) for m in matched]
+
+def test_short_then_cover(execution):
+    short = execution('TSLA', 'S', 10, 110.0, "20240102-15:00:00")
+    cover = execution('TSLA', 'B', 10, 100.0, "20240103-15:00:00")
+    matched, open_lots = generator.match_instrument_trades([cover, short])
+
+    assert trips(matched) == [('SHORT', 10.0, 100.0, 110.0)]
+    assert matched[0]['open_date'] < matched[0]['close_date']
+    assert matched[0]['gross_pnl'] == 100.0
+    assert matched[0]['sizing'] == 1100.0  # Proceeds of the opening sell
+    assert open_lots == []
+
+def test_flip_through_flat(execution):
+    trades = [execution('TSLA', 'B', 10, 100.0, "20240102-15:00:00"),
+              execution('TSLA', 'S', 15, 110.0, "20240103-15:00:00"),  # Closes the long, opens 5 short
+              execution('TSLA', 'B', 8, 105.0, "20240104-15:00:00")]   # Covers the short, opens 3 long
+    matched, open_lots = generator.match_instrument_trades(trades)
+
+    assert trips(matched) == [('LONG', 10.0, 100.0, 110.0), ('SHORT', 5.0, 105.0, 110.0)]
+    assert [(lot['side'], lot['size'], lot['net_amount']) for lot in open_lots] == [('B', 3.0, 315.0)]
+
+def test_partial_fills(execution):
+    trades = [execution('AAPL', 'B', 5, 100.0, "20240102-15:00:00"),
+              execution('AAPL', 'B', 5, 102.0, "20240102-15:01:00"),
+              execution('AAPL', 'S', 8, 110.0, "20240103-15:00:00"),  # One sell across both buys
+              execution('AAPL', 'S', 1, 111.0, "20240103-15:01:00")]
+    matched, open_lots = generator.match_instrument_trades(trades)
+
+    assert trips(matched) == [('LONG', 5.0, 100.0, 110.0), ('LONG', 3.0, 102.0, 110.0), ('LONG', 1.0, 102.0, 111.0)]
+    assert [(lot['size'], lot['price'], lot['net_amount']) for lot in open_lots] == [(1.0, 102.0, 102.0)]
+
+@pytest.mark.parametrize("lot_method, closed_at, still_open", [
+    ('fifo', 100.0, [(10.0, 120.0), (10.0, 110.0)]),
+    ('lifo', 110.0, [(10.0, 100.0), (10.0, 120.0)]),
+    ('hifo', 120.0, [(10.0, 100.0), (10.0, 110.0)]),
+    ('average', 110.0, [(10.0, 110.0), (10.0, 110.0)]),
+])
+def test_lot_methods(execution, lot_method, closed_at, still_open):
+    trades = [execution('AAPL', 'B', 10, 100.0, "20240102-15:00:00"),
+              execution('AAPL', 'B', 10, 120.0, "20240102-15:01:00"),
+              execution('AAPL', 'B', 10, 110.0, "20240102-15:02:00"),
+              execution('AAPL', 'S', 10, 115.0, "20240103-15:00:00")]
+    matched, open_lots = generator.match_instrument_trades(trades, lot_method)
+
+    assert trips(matched) == [('LONG', 10.0, closed_at, 115.0)]
+    assert [(lot['size'], lot['price']) for lot in open_lots] == still_open
+
+def test_average_cost_reprices_after_adding(execution):
+    trades = [execution('AAPL', 'B', 10, 100.0, "20240102-15:00:00"),
+              execution('AAPL', 'B', 10, 120.0, "20240102-15:01:00"),
+              execution('AAPL', 'S', 5, 130.0, "20240103-15:00:00"),
+              execution('AAPL', 'B', 5, 140.0, "20240103-15:01:00"),
+              execution('AAPL', 'S', 20, 150.0, "20240104-15:00:00")]
+    matched, open_lots = generator.match_instrument_trades(trades, 'average')
+
+    # 15 left at 110 plus 5 at 140 average out at 117.50
+    assert [m['buy_price'] for m in matched] == [110.0, 117.5, 117.5, 117.5]
+    assert sum(m['quantity'] for m in matched) == 25.0
+    assert open_lots == []
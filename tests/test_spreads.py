@@ -0,0 +1,60 @@
+import pandas as pd
+
+from spreads import SPREAD_COLUMNS, group_spreads
+
+
+def leg(strike, right, direction, net_pnl=0.0, opened="2024-01-02 15:00:00", sizing=500.0, quantity=1.0):
+    return {"symbol": "SPY", "expiry": "Jan19 '24", "strike": strike, "right": right, "direction": direction,
+            "quantity": quantity, "open_date": pd.Timestamp(opened), "close_date": pd.Timestamp("2024-01-05 15:00:00"),
+            "sizing": sizing, "gross_pnl": net_pnl + 1.0, "net_pnl": net_pnl, "commission": 1.0}
+
+def spreads_of(*legs):
+    return group_spreads(pd.DataFrame(list(legs), columns=SPREAD_COLUMNS), window=60, max_size_per_trade=1000)
+
+def test_vertical_needs_a_bought_and_a_sold_leg():
+    vertical = spreads_of(leg(400, 'C', 'LONG', 150.0), leg(405, 'C', 'SHORT', -50.0))
+    assert vertical['Strategy'].tolist() == ["Vertical"]
+    assert vertical['TRADE'].tolist() == ["SPY Jan19 '24 +400C -405C"]
+
+    both_long = spreads_of(leg(400, 'C', 'LONG', 150.0), leg(405, 'C', 'LONG', -50.0))
+    assert both_long['Strategy'].tolist() == ["2-Leg Combo"]
+
+def test_percentages_match_the_trade_log():
+    spread = spreads_of(leg(400, 'P', 'LONG', 150.0), leg(400, 'C', 'LONG', -50.0)).iloc[0]
+    assert spread['Strategy'] == "Straddle"
+    assert spread['Per Trade % Gain/Loss'] == 10.0  # 100 / 1000 sizing
+    assert spread['Net Trade % Gain/Loss'] == 10.0  # 100 / max size per trade
+    spread = spreads_of(leg(400, 'P', 'LONG', 150.0, sizing=250.0), leg(400, 'C', 'LONG', -50.0, sizing=250.0)).iloc[0]
+    assert spread['Per Trade % Gain/Loss'] == 20.0
+    assert spread['Net Trade % Gain/Loss'] == 10.0
+
+def strategy(*legs):
+    return spreads_of(*legs)['Strategy'].tolist()
+
+def test_straddles_and_strangles_need_both_legs_on_one_side():
+    assert strategy(leg(400, 'C', 'LONG'), leg(400, 'P', 'LONG')) == ["Straddle"]
+    assert strategy(leg(400, 'C', 'SHORT'), leg(400, 'P', 'SHORT')) == ["Straddle"]
+    assert strategy(leg(410, 'C', 'SHORT'), leg(390, 'P', 'SHORT')) == ["Strangle"]
+    assert strategy(leg(400, 'C', 'LONG'), leg(400, 'P', 'SHORT')) == ["2-Leg Combo"]  # Synthetic long
+    assert strategy(leg(410, 'C', 'LONG'), leg(390, 'P', 'SHORT')) == ["2-Leg Combo"]
+
+def test_butterfly_needs_opposite_body_and_one_two_one_sizes():
+    assert strategy(leg(400, 'C', 'LONG'), leg(405, 'C', 'SHORT', quantity=2.0), leg(410, 'C', 'LONG')) == ["Butterfly"]
+    # The body filled in two pieces still adds up to 2
+    assert strategy(leg(400, 'P', 'SHORT'), leg(405, 'P', 'LONG'), leg(405, 'P', 'LONG'), leg(410, 'P', 'SHORT')) == ["Butterfly"]
+    assert strategy(leg(400, 'C', 'LONG'), leg(405, 'C', 'LONG'), leg(410, 'C', 'LONG')) == ["3-Leg Combo"]
+    assert strategy(leg(400, 'C', 'LONG'), leg(405, 'C', 'SHORT'), leg(410, 'C', 'LONG')) == ["3-Leg Combo"]
+
+def test_condor_needs_opposite_inner_strikes():
+    assert strategy(leg(400, 'C', 'LONG'), leg(405, 'C', 'SHORT'), leg(410, 'C', 'SHORT'), leg(415, 'C', 'LONG')) == ["Condor"]
+    assert strategy(leg(400, 'C', 'LONG'), leg(405, 'C', 'LONG'), leg(410, 'C', 'SHORT'), leg(415, 'C', 'SHORT')) == ["4-Leg Combo"]
+
+def test_iron_structures_need_a_put_vertical_below_a_call_vertical():
+    condor = [leg(390, 'P', 'LONG'), leg(395, 'P', 'SHORT'), leg(405, 'C', 'SHORT'), leg(410, 'C', 'LONG')]
+    assert strategy(*condor) == ["Iron Condor"]
+    assert strategy(leg(390, 'P', 'LONG'), leg(400, 'P', 'SHORT'), leg(400, 'C', 'SHORT'), leg(410, 'C', 'LONG')) == ["Iron Butterfly"]
+    # Four bought options, and a box (the verticals overlap), are not iron condors
+    assert strategy(leg(390, 'P', 'LONG'), leg(395, 'P', 'LONG'), leg(405, 'C', 'LONG'), leg(410, 'C', 'LONG')) == ["4-Leg Combo"]
+    assert strategy(leg(400, 'C', 'LONG'), leg(410, 'C', 'SHORT'), leg(410, 'P', 'LONG'), leg(400, 'P', 'SHORT')) == ["4-Leg Combo"]
+    # Calls sold inside, puts bought inside: two verticals that do not form the wings
+    assert strategy(leg(390, 'P', 'SHORT'), leg(395, 'P', 'LONG'), leg(405, 'C', 'SHORT'), leg(410, 'C', 'LONG')) == ["4-Leg Combo"]
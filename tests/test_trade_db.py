@@ -0,0 +1,89 @@
+from datetime import datetime
+
+import generator
+from trade_db import TradeDB
+
+
+def window(trades):
+    times = [datetime.strptime(t['trade_time'], "%Y%m%d-%H:%M:%S") for t in trades]
+    return min(times), max(times)
+
+def sync_window(db, trades):
+    matched, unmatched = generator.match_buy_sell_pairs(trades)
+    since, until = window(trades)
+    return db.sync('U1', matched, unmatched, since=since, until=until)
+
+def test_successive_windows_keep_history(tmp_path, execution):
+    db = TradeDB(str(tmp_path / "trades.db"))
+    week1 = [execution('AAPL', 'B', 10, 100.0, "20240102-15:00:00"), execution('AAPL', 'S', 10, 110.0, "20240103-15:00:00")]
+    week2 = [execution('MSFT', 'B', 5, 300.0, "20240109-15:00:00"), execution('MSFT', 'S', 5, 290.0, "20240110-15:00:00")]
+
+    assert sync_window(db, week1) == (1, 0)
+    assert sync_window(db, week2) == (1, 0)
+
+    _, rows = db.query("SELECT instrument FROM round_trips ORDER BY open_time")
+    assert [row[0] for row in rows] == ['AAPL', 'MSFT']
+    _, rows = db.query("SELECT SUM(trades), ROUND(SUM(gross_pnl), 2) FROM rollups")
+    assert rows == [(2, 50.0)]
+    _, rows = db.query("SELECT SUM(trades) FROM equity_buckets WHERE granularity = 'daily'")
+    assert rows == [(2,)]
+
+def test_rematched_window_replaces_its_own_trips(tmp_path, execution):
+    db = TradeDB(str(tmp_path / "trades.db"))
+    old = [execution('AAPL', 'B', 10, 100.0, "20240102-15:00:00"), execution('AAPL', 'S', 10, 110.0, "20240103-15:00:00")]
+    buy = execution('MSFT', 'B', 5, 300.0, "20240109-15:00:00")
+    sell = execution('MSFT', 'S', 5, 290.0, "20240110-15:00:00")
+    sync_window(db, old)
+    sync_window(db, [buy, sell])
+
+    # The same window re-fetched with a corrected fill price re-derives the MSFT trip only
+    assert sync_window(db, [buy, dict(sell, execution_id='test.corrected', price=295.0)]) == (1, 1)
+    _, rows = db.query("SELECT instrument, gross_pnl FROM round_trips ORDER BY open_time")
+    assert rows == [('AAPL', 100.0), ('MSFT', -25.0)]
+
+def test_full_replay_reconciles_everything(tmp_path, execution):
+    db = TradeDB(str(tmp_path / "trades.db"))
+    trades = [execution('AAPL', 'B', 10, 100.0, "20240102-15:00:00"), execution('AAPL', 'S', 10, 110.0, "20240103-15:00:00")]
+    sync_window(db, trades)
+
+    assert db.sync('U1', [], [], since=None) == (0, 1)
+    _, rows = db.query("SELECT COUNT(*) FROM rollups")
+    assert rows == [(0,)]
+
+def test_rollups_cover_every_window_and_match_round_trips(tmp_path, execution):
+    db = TradeDB(str(tmp_path / "trades.db"))
+    sync_window(db, [execution('AAPL', 'B', 10, 100.0, "20240102-15:00:00"), execution('AAPL', 'S', 10, 110.0, "20240103-15:00:00")])
+    sync_window(db, [execution('AAPL', 'B', 10, 100.0, "20240205-15:00:00"), execution('AAPL', 'S', 10, 90.0, "20240206-15:00:00")])
+
+    columns, rows = db.rollup('month')
+    assert columns[:4] == ['month', 'trades', 'gross_pnl', 'net_pnl']
+    assert [row[:3] for row in rows] == [('2024-01', 1, 100.0), ('2024-02', 1, -100.0)]
+
+    _, by_instrument = db.rollup(None, by=('instrument',), order_by='net_pnl DESC')
+    _, expected = db.query("SELECT instrument, COUNT(*), ROUND(SUM(gross_pnl), 2) FROM round_trips GROUP BY 1")
+    assert [row[:3] for row in by_instrument] == expected
+
+def test_older_window_leaves_newer_history_alone(tmp_path, execution):
+    db = TradeDB(str(tmp_path / "trades.db"))
+    january = [execution('AAPL', 'B', 10, 100.0, "20240102-15:00:00"), execution('AAPL', 'S', 10, 110.0, "20240103-15:00:00")]
+    march = [execution('MSFT', 'B', 5, 300.0, "20240304-15:00:00"), execution('MSFT', 'S', 5, 290.0, "20240305-15:00:00")]
+    sync_window(db, january)
+    sync_window(db, march)
+
+    assert sync_window(db, january) == (0, 0)
+    _, rows = db.query("SELECT instrument FROM round_trips ORDER BY open_time")
+    assert [row[0] for row in rows] == ['AAPL', 'MSFT']
+    _, rows = db.query("SELECT SUM(trades) FROM equity_buckets WHERE granularity = 'daily'")
+    assert rows == [(2,)]
+
+def test_open_lots_outside_the_window_are_kept(tmp_path, execution):
+    db = TradeDB(str(tmp_path / "trades.db"))
+    sync_window(db, [execution('AAPL', 'B', 10, 100.0, "20240102-15:00:00"), execution('AAPL', 'B', 1, 101.0, "20240103-15:00:00")])
+    sync_window(db, [execution('MSFT', 'B', 5, 300.0, "20240304-15:00:00"), execution('MSFT', 'B', 1, 301.0, "20240305-15:00:00")])
+    _, rows = db.query("SELECT instrument, quantity FROM open_lots ORDER BY open_time")
+    assert rows == [('AAPL', 10.0), ('AAPL', 1.0), ('MSFT', 5.0), ('MSFT', 1.0)]
+
+    # Re-fetching March with one lot since closed replaces only March's lots
+    sync_window(db, [execution('MSFT', 'B', 5, 300.0, "20240304-15:00:00"), execution('MSFT', 'S', 5, 310.0, "20240305-15:00:00")])
+    _, rows = db.query("SELECT instrument, quantity FROM open_lots ORDER BY open_time")
+    assert rows == [('AAPL', 10.0), ('AAPL', 1.0)]
@@ -0,0 +1,37 @@
+import threading
+
+import generator
+import watch
+
+
+class Responses:
+    """Stands in for the gateway client, answering each trades poll with the next list"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.done = threading.Event()
+        self.cached = []
+
+    def get_json(self, endpoint, params=None, timeout=10, cached=True):
+        self.cached.append(cached)
+        if len(self.responses) == 1:
+            self.done.set()
+        return self.responses.pop(0) if self.responses else []
+
+
+def test_new_fill_is_seen_when_an_old_one_ages_out(monkeypatch, execution):
+    old, kept, new = (execution('AAPL', 'B', 1, 100.0, "20240102-15:00:00") for _ in range(3))
+    gateway = Responses([old, kept], [kept, new])
+    monkeypatch.setattr(generator, "gateway", gateway)
+    watcher = watch.Watcher(run=lambda: None)
+    stopping = threading.Event()
+
+    thread = threading.Thread(target=watch.execution_trigger, args=(watcher, stopping, 0.01))
+    thread.start()
+    gateway.done.wait(5)
+    stopping.set()
+    thread.join()
+
+    # Same count as the previous poll, but one execution id is new
+    assert watcher.pending == {"1 new executions": 1}
+    assert gateway.cached == [False, False]  # Live fills every time, never a cached body
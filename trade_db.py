@@ -0,0 +1,340 @@
+import hashlib
+import sqlite3
+
+import pandas as pd
+
+from equity_curve import GRANULARITIES, bucket_pnl
+from exec_journal import execution_hash
+
+"""SQLite store of matched round trips and open lots, indexed for ad hoc queries"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS round_trips (
+    trip_key TEXT PRIMARY KEY,
+    account TEXT NOT NULL,
+    instrument TEXT NOT NULL,
+    symbol TEXT,
+    sec_type TEXT,
+    direction TEXT,
+    open_time TEXT NOT NULL,      -- 'YYYY-MM-DD HH:MM:SS'
+    close_time TEXT NOT NULL,
+    open_date TEXT NOT NULL,      -- 'YYYY-MM-DD'
+    close_date TEXT NOT NULL,
+    duration_days INTEGER,
+    holding_seconds REAL,
+    quantity REAL,
+    buy_price REAL,
+    sell_price REAL,
+    sizing REAL,
+    gross_pnl REAL,
+    net_pnl REAL,
+    commission REAL
+);
+CREATE INDEX IF NOT EXISTS idx_trips_instrument ON round_trips (instrument);
+CREATE INDEX IF NOT EXISTS idx_trips_open_date ON round_trips (open_date);
+CREATE INDEX IF NOT EXISTS idx_trips_close_date ON round_trips (close_date);
+CREATE INDEX IF NOT EXISTS idx_trips_sec_type ON round_trips (sec_type, close_date);
+CREATE INDEX IF NOT EXISTS idx_trips_holding ON round_trips (sec_type, holding_seconds);
+CREATE INDEX IF NOT EXISTS idx_trips_account ON round_trips (account, close_date);
+
+CREATE TABLE IF NOT EXISTS open_lots (
+    account TEXT NOT NULL,
+    instrument TEXT NOT NULL,
+    symbol TEXT,
+    sec_type TEXT,
+    side TEXT,
+    open_time TEXT,
+    quantity REAL,
+    price REAL,
+    commission REAL,
+    net_amount REAL
+);
+CREATE INDEX IF NOT EXISTS idx_lots_instrument ON open_lots (instrument);
+CREATE INDEX IF NOT EXISTS idx_lots_sec_type ON open_lots (sec_type);
+CREATE INDEX IF NOT EXISTS idx_lots_account ON open_lots (account);
+
+-- Round trips summed per close date, kept up to date as trips are added and removed
+CREATE TABLE IF NOT EXISTS rollups (
+    account TEXT NOT NULL,
+    close_date TEXT NOT NULL,
+    instrument TEXT NOT NULL,
+    sec_type TEXT NOT NULL,
+    trades INTEGER NOT NULL,
+    gross_pnl REAL NOT NULL,
+    net_pnl REAL NOT NULL,
+    commission REAL NOT NULL,
+    sizing REAL NOT NULL,
+    wins INTEGER NOT NULL,
+    losses INTEGER NOT NULL,
+    PRIMARY KEY (account, close_date, instrument, sec_type)
+);
+CREATE INDEX IF NOT EXISTS idx_rollups_date ON rollups (close_date);
+CREATE INDEX IF NOT EXISTS idx_rollups_instrument ON rollups (instrument);
+
+-- Realized P&L per close-time bucket at each equity curve granularity, kept like the rollups
+CREATE TABLE IF NOT EXISTS equity_buckets (
+    account TEXT NOT NULL,
+    granularity TEXT NOT NULL,    -- '1min', '1h' or 'daily'
+    bucket TEXT NOT NULL,         -- bucket start, 'YYYY-MM-DD HH:MM:SS'
+    trades INTEGER NOT NULL,
+    net_pnl REAL NOT NULL,
+    PRIMARY KEY (account, granularity, bucket)
+) WITHOUT ROWID;
+"""
+
+ROLLUP_UPSERT = """
+INSERT INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (account, close_date, instrument, sec_type) DO UPDATE SET
+    trades = trades + excluded.trades,
+    gross_pnl = gross_pnl + excluded.gross_pnl,
+    net_pnl = net_pnl + excluded.net_pnl,
+    commission = commission + excluded.commission,
+    sizing = sizing + excluded.sizing,
+    wins = wins + excluded.wins,
+    losses = losses + excluded.losses
+"""
+
+EQUITY_UPSERT = """
+INSERT INTO equity_buckets VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (account, granularity, bucket) DO UPDATE SET
+    trades = trades + excluded.trades,
+    net_pnl = net_pnl + excluded.net_pnl
+"""
+
+ROLLUP_COLUMNS = ['trades', 'gross_pnl', 'net_pnl', 'commission', 'sizing', 'wins', 'losses', 'win_rate']
+
+# SQLite date expressions that bucket a close_date for rollup views
+PERIODS = {
+    'day': "close_date",
+    'week': "date(close_date, 'weekday 0', '-6 days')",  # Monday of the week
+    'month': "substr(close_date, 1, 7)",
+}
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+def _leg_id(trade):
+    # The same hash the journal stores, so live and --from-journal runs agree on identity
+    return execution_hash(trade)
+
+def trip_key(account, matched_trade):
+    """Identity of a round trip: the two legs it pairs and how much of them"""
+    m = matched_trade
+    key = (f"{account}|{m['direction']}|{_leg_id(m['buy_trade'])}|{_leg_id(m['sell_trade'])}|"
+           f"{m['quantity']}|{m['buy_price']}|{m['sell_price']}")
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()
+
+def _format_time(trade_time):
+    """IBKR trade_time string (or datetime from the journal) as sortable ISO text"""
+    from generator import parse_trade_time
+    return parse_trade_time(trade_time).strftime(TIME_FORMAT) if trade_time else None
+
+
+class TradeDB:
+    """Round trips and open lots in an indexed SQLite file
+
+    sync() is incremental: round trips are keyed by their legs, so re-syncing the
+    same matches is a no-op and only new or no-longer-valid trips are written.
+    """
+
+    def __init__(self, path="trades.db"):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+        # Databases created before rollups existed get them built once from the raw rows
+        if (self.conn.execute("SELECT 1 FROM round_trips LIMIT 1").fetchone()
+                and not self.conn.execute("SELECT 1 FROM rollups LIMIT 1").fetchone()):
+            self.rebuild_rollups()
+        if (self.conn.execute("SELECT 1 FROM round_trips LIMIT 1").fetchone()
+                and not self.conn.execute("SELECT 1 FROM equity_buckets LIMIT 1").fetchone()):
+            self.rebuild_equity()
+
+    def close(self):
+        self.conn.execute("PRAGMA optimize")  # Refresh planner statistics for the new indexes
+        self.conn.close()
+
+    def sync(self, account, matched_trades, unmatched_executions, since=None, until=None):
+        """Bring the tables in line with the latest matcher output; returns (added, removed) trips
+
+        since and until are the earliest and latest execution times the matcher saw
+        (datetimes). Only trips and open lots opened inside that window can be re-derived
+        from this run, so only those are removed when they no longer match; history on
+        either side is kept. since=None means the matcher saw every execution.
+        """
+        current = {}
+        for m in matched_trades:
+            if m:
+                key = base = trip_key(account, m)
+                n = 1
+                while key in current:  # Identical legs without execution ids
+                    key, n = f"{base}-{n}", n + 1
+                current[key] = m
+
+        existing = {row[0] for row in self.conn.execute("SELECT trip_key FROM round_trips WHERE account = ?", (account,))}
+        window = "account = ?"
+        params = (account,)
+        if since is not None:
+            window += " AND open_time >= ?"
+            params += (since.isoformat(' ', 'seconds'),)
+            if until is not None:
+                window += " AND open_time <= ?"
+                params += (until.isoformat(' ', 'seconds'),)
+        rematched = {row[0] for row in self.conn.execute(f"SELECT trip_key FROM round_trips WHERE {window}", params)}
+        added_keys = [key for key in current if key not in existing]
+        removed_keys = [key for key in rematched if key not in current]
+
+        with self.conn:
+            removed = self._remove_trips(removed_keys)
+            added = self._add_trips(account, [(key, current[key]) for key in added_keys])
+
+            # Open lots inside the window are fully determined by this match, so just replace them
+            self.conn.execute(f"DELETE FROM open_lots WHERE {window}", params)
+            self.conn.executemany(
+                "INSERT INTO open_lots VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [self._lot_row(account, trade) for trade in unmatched_executions])
+
+        return added, removed
+
+    def _trip_row(self, account, key, m):
+        open_time = m['open_date'].isoformat(' ', 'seconds')
+        close_time = m['close_date'].isoformat(' ', 'seconds')
+        return (
+            key, account, m['instrument'], m['buy_trade'].get('symbol'), m['sec_type'], m['direction'],
+            open_time, close_time, open_time[:10], close_time[:10],
+            m['duration'], (m['close_date'] - m['open_date']).total_seconds(),
+            m['quantity'], m['buy_price'], m['sell_price'], m['sizing'],
+            m['gross_pnl'], m['net_pnl'], m['total_commission'],
+        )
+
+    def _add_trips(self, account, keyed_trips):
+        rows = [self._trip_row(account, key, m) for key, m in keyed_trips]
+        self.conn.executemany(
+            "INSERT INTO round_trips VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        self._apply_rollup_deltas(rows, sign=1)
+        self._apply_equity_deltas(rows, sign=1)
+        return len(rows)
+
+    def _remove_trips(self, keys):
+        rows = []
+        for key in keys:
+            rows.extend(self.conn.execute("SELECT * FROM round_trips WHERE trip_key = ?", (key,)))
+        self.conn.executemany("DELETE FROM round_trips WHERE trip_key = ?", [(key,) for key in keys])
+        self._apply_rollup_deltas(rows, sign=-1)
+        self._apply_equity_deltas(rows, sign=-1)
+        return len(keys)
+
+    def _apply_rollup_deltas(self, trip_rows, sign):
+        """Fold added (sign=1) or removed (sign=-1) round_trips rows into the rollups"""
+        deltas = {}
+        for row in trip_rows:
+            # Columns as in round_trips: account 1, instrument 2, sec_type 4, close_date 9,
+            # sizing 15, gross_pnl 16, net_pnl 17, commission 18
+            key = (row[1], row[9], row[2], row[4] or '')
+            delta = deltas.setdefault(key, [0, 0.0, 0.0, 0.0, 0.0, 0, 0])
+            net_pnl = row[17]
+            delta[0] += 1
+            delta[1] += row[16]
+            delta[2] += net_pnl
+            delta[3] += row[18]
+            delta[4] += row[15]
+            delta[5] += net_pnl > 0
+            delta[6] += net_pnl < 0
+
+        self.conn.executemany(ROLLUP_UPSERT, [key + tuple(sign * value for value in delta) for key, delta in deltas.items()])
+        if sign < 0:
+            self.conn.execute("DELETE FROM rollups WHERE trades <= 0")
+
+    def _apply_equity_deltas(self, trip_rows, sign):
+        """Fold added or removed round_trips rows into the equity buckets at every granularity"""
+        if not trip_rows:
+            return
+        # Columns as in round_trips: account 1, close_time 7, net_pnl 17
+        trips = pd.DataFrame({'account': [row[1] for row in trip_rows],
+                              'close_time': pd.to_datetime([row[7] for row in trip_rows]),
+                              'net_pnl': [row[17] for row in trip_rows]})
+        rows = []
+        for account, account_trips in trips.groupby('account'):
+            for granularity in GRANULARITIES:
+                buckets = bucket_pnl(account_trips['close_time'], account_trips['net_pnl'], granularity)
+                rows.extend((account, granularity, bucket.isoformat(' ', 'seconds'), sign * int(trades), sign * float(pnl))
+                            for bucket, trades, pnl in zip(buckets.index, buckets['trades'], buckets['net_pnl']))
+
+        self.conn.executemany(EQUITY_UPSERT, rows)
+        if sign < 0:
+            self.conn.execute("DELETE FROM equity_buckets WHERE trades <= 0")
+
+    def rebuild_equity(self):
+        """Recompute every equity bucket from round_trips (only needed for older databases)"""
+        with self.conn:
+            self.conn.execute("DELETE FROM equity_buckets")
+            self._apply_equity_deltas(self.conn.execute("SELECT * FROM round_trips").fetchall(), sign=1)
+
+    def equity(self, account, granularity='1h', start=None, end=None):
+        """Stored bucket sums (bucket, trades, net_pnl) for an account, oldest first"""
+        sql = "SELECT bucket, trades, net_pnl FROM equity_buckets WHERE account = ? AND granularity = ?"
+        params = [account, granularity]
+        if start is not None:
+            sql += " AND bucket >= ?"
+            params.append(start)
+        if end is not None:
+            sql += " AND bucket <= ?"
+            params.append(end)
+        columns, rows = self.query(sql + " ORDER BY bucket", params)
+        return pd.DataFrame(rows, columns=columns)
+
+    def rebuild_rollups(self):
+        """Recompute every rollup from round_trips (only needed for older databases)"""
+        with self.conn:
+            self.conn.execute("DELETE FROM rollups")
+            self.conn.execute("""
+                INSERT INTO rollups
+                SELECT account, close_date, instrument, COALESCE(sec_type, ''), COUNT(*), SUM(gross_pnl),
+                       SUM(net_pnl), SUM(commission), SUM(sizing), SUM(net_pnl > 0), SUM(net_pnl < 0)
+                FROM round_trips GROUP BY account, close_date, instrument, COALESCE(sec_type, '')
+            """)
+
+    def rollup(self, period='day', by=(), account=None, start=None, end=None, order_by=None):
+        """Sum the rollups into dashboard rows per period (day, week, month, or None for all
+        time) and any of instrument / sec_type / account; returns (column names, rows)
+
+        order_by is an output column, optionally followed by DESC (default: the first column).
+        """
+        group = ([f"{PERIODS[period]} AS {period}"] if period else []) + [
+            col for col in by if col in ('account', 'instrument', 'sec_type')]
+        if not group:
+            raise ValueError("rollup needs a period or at least one grouping column")
+        where, params = [], []
+        for clause, value in (("account = ?", account), ("close_date >= ?", start), ("close_date <= ?", end)):
+            if value is not None:
+                where.append(clause)
+                params.append(value)
+
+        if order_by is not None:
+            column, _, direction = order_by.partition(' ')
+            if column not in ROLLUP_COLUMNS + [name.split(' AS ')[-1] for name in group] or direction not in ('', 'ASC', 'DESC'):
+                raise ValueError(f"cannot order rollups by {order_by!r}")
+
+        sql = f"""
+            SELECT {', '.join(group)}, SUM(trades) AS trades, ROUND(SUM(gross_pnl), 2) AS gross_pnl,
+                   ROUND(SUM(net_pnl), 2) AS net_pnl, ROUND(SUM(commission), 2) AS commission,
+                   ROUND(SUM(sizing), 2) AS sizing, SUM(wins) AS wins, SUM(losses) AS losses,
+                   ROUND(100.0 * SUM(wins) / NULLIF(SUM(wins) + SUM(losses), 0), 1) AS win_rate
+            FROM rollups {'WHERE ' + ' AND '.join(where) if where else ''}
+            GROUP BY {', '.join(str(i + 1) for i in range(len(group)))}
+            ORDER BY {order_by or '1'}
+        """
+        return self.query(sql, params)
+
+    def _lot_row(self, account, trade):
+        from generator import parse_instrument_name
+        return (
+            account, parse_instrument_name(trade), trade.get('symbol'), trade.get('sec_type'), trade.get('side'),
+            _format_time(trade.get('trade_time')), float(trade.get('size', 0)), float(trade.get('price', 0)),
+            float(trade.get('commission', 0)), float(trade.get('net_amount', 0)),
+        )
+
+    def query(self, sql, params=()):
+        """Run a query; returns (column names, rows)"""
+        cursor = self.conn.execute(sql, params)
+        columns = [description[0] for description in cursor.description or []]
+        return columns, cursor.fetchall()
@@ -0,0 +1,223 @@
+import argparse
+import fnmatch
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import generator
+from exec_journal import execution_hash
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:  # Optional: fall back to polling the directory
+    INotify = None
+
+WATCH_INTERVAL = generator.cfg.get("watch_interval", 300)  # Seconds between runs while the market is open
+WATCH_OFF_HOURS_INTERVAL = generator.cfg.get("watch_off_hours_interval", 3600)  # Outside market hours; 0 to pause
+MARKET_TIMEZONE = generator.cfg.get("market_timezone", "America/New_York")
+MARKET_HOURS = generator.cfg.get("market_hours", ["09:30", "16:00"])  # Local open and close, Monday to Friday
+WATCH_DIR = generator.cfg.get("watch_dir", "")  # Statement drop folder; empty disables the directory trigger
+WATCH_PATTERNS = generator.cfg.get("watch_patterns", ["*.csv", "*.xml", "*.pdf"])
+WATCH_EXECUTION_POLL = generator.cfg.get("watch_execution_poll", 30)  # Seconds between new-execution checks; 0 disables
+WATCH_DEBOUNCE = generator.cfg.get("watch_debounce", 10)  # Quiet seconds that end a burst of triggers
+WATCH_MAX_DELAY = generator.cfg.get("watch_max_delay", 60)  # Never hold a triggered run back longer than this
+
+def market_is_open(now=None, timezone=MARKET_TIMEZONE, hours=MARKET_HOURS):
+    """Regular session check in the exchange's timezone (holidays are not known)"""
+    now = (now or datetime.now(ZoneInfo(timezone))).astimezone(ZoneInfo(timezone))
+    opens, closes = hours
+    return now.weekday() < 5 and opens <= now.strftime("%H:%M") < closes
+
+
+class Watcher:
+    """Turns bursts of triggers into single, never overlapping regenerations
+
+    Triggers can come from any thread. The first one starts a debounce window that
+    closes after `debounce` quiet seconds (or `max_delay` at the latest), and then one
+    run covers every trigger seen so far. Scheduled ticks that land while a run is in
+    progress are skipped; file and execution events are kept for one follow-up run.
+    """
+
+    def __init__(self, run, debounce=WATCH_DEBOUNCE, max_delay=WATCH_MAX_DELAY):
+        self.run = run
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.condition = threading.Condition()
+        self.pending = {}  # reason -> number of triggers
+        self.first_trigger = None
+        self.last_trigger = None
+        self.running = False
+        self.runs = 0
+        self.skipped = 0
+        self.failures = 0
+        self.durations = deque(maxlen=50)
+
+    def trigger(self, reason, skip_if_running=False):
+        with self.condition:
+            if self.running and skip_if_running:
+                self.skipped += 1
+                print(f"⏭️ Skipping {reason}: a run is still in progress ({self.skipped} skipped so far)")
+                return
+            now = time.monotonic()
+            self.pending[reason] = self.pending.get(reason, 0) + 1
+            self.first_trigger = self.first_trigger or now
+            self.last_trigger = now
+            self.condition.notify_all()
+
+    def _wait_for_burst(self, stopping):
+        """Block until a debounced batch of triggers is ready; returns it (empty when stopping)"""
+        with self.condition:
+            while not self.pending and not stopping.is_set():
+                self.condition.wait(timeout=1)
+            while not stopping.is_set():
+                now = time.monotonic()
+                ready_at = min(self.last_trigger + self.debounce, self.first_trigger + self.max_delay)
+                if now >= ready_at:
+                    break
+                self.condition.wait(timeout=ready_at - now)
+            if stopping.is_set():
+                return {}
+            batch, self.pending = self.pending, {}
+            self.first_trigger = self.last_trigger = None
+            self.running = True
+            return batch
+
+    def loop(self, stopping):
+        while not stopping.is_set():
+            batch = self._wait_for_burst(stopping)
+            if not batch:
+                continue
+
+            reasons = ", ".join(f"{reason} x{count}" if count > 1 else reason for reason, count in batch.items())
+            print(f"\n🔁 Regenerating ({reasons})")
+            started = time.perf_counter()
+            try:
+                self.run()
+            except (Exception, SystemExit) as e:
+                self.failures += 1
+                print(f"❌ Run failed: {e!r}")
+            finally:
+                with self.condition:
+                    self.running = False
+            self.runs += 1
+            self.durations.append(time.perf_counter() - started)
+            print(f"⏱️ {self.describe()}")
+
+    def describe(self):
+        if not self.durations:
+            return "no runs yet"
+        durations = list(self.durations)
+        return (f"Run {self.runs} took {durations[-1]:.1f}s (avg {sum(durations) / len(durations):.1f}s, "
+                f"max {max(durations):.1f}s); {self.skipped} ticks skipped, {self.failures} failed")
+
+
+def interval_trigger(watcher, stopping, interval=WATCH_INTERVAL, off_hours_interval=WATCH_OFF_HOURS_INTERVAL):
+    """Tick every interval seconds during market hours and every off_hours_interval outside them"""
+    while not stopping.is_set():
+        is_open = market_is_open()
+        wait = interval if is_open else off_hours_interval
+        if wait:
+            watcher.trigger("market hours tick" if is_open else "off-hours tick", skip_if_running=True)
+        # Re-check the session state at least once a minute while paused
+        stopping.wait(wait or 60)
+        if wait and watcher.durations and watcher.durations[-1] > wait:
+            print(f"⚠️ Runs take {watcher.durations[-1]:.0f}s, longer than the {wait}s interval")
+
+def _matches(name, patterns):
+    return not name.startswith('.') and any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+def directory_trigger(watcher, stopping, directory=WATCH_DIR, patterns=WATCH_PATTERNS, poll=5):
+    """Trigger when statement files are created in (or moved into) directory
+
+    Uses inotify when inotify_simple is installed, otherwise compares directory listings
+    every poll seconds.
+    """
+    if INotify is not None:
+        inotify = INotify()
+        inotify.add_watch(directory, inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO)
+        print(f"👀 Watching {directory} with inotify")
+        while not stopping.is_set():
+            for event in inotify.read(timeout=1000):
+                if _matches(event.name, patterns):
+                    watcher.trigger(f"new file {event.name}")
+        inotify.close()
+        return
+
+    print(f"👀 Watching {directory} by polling every {poll}s (pip install inotify_simple for inotify)")
+    def listing():
+        with os.scandir(directory) as entries:
+            return {e.name: e.stat().st_mtime for e in entries if e.is_file() and _matches(e.name, patterns)}
+    seen = listing()
+    while not stopping.wait(poll):
+        current = listing()
+        for name, mtime in current.items():
+            if seen.get(name) != mtime:
+                watcher.trigger(f"new file {name}")
+        seen = current
+
+def execution_trigger(watcher, stopping, poll=WATCH_EXECUTION_POLL):
+    """Trigger when the gateway reports executions it did not report last time
+
+    Executions are compared by id, so fills that age out of the trailing one-day window
+    cannot hide new ones, and polls bypass the response cache so they see live fills.
+    Polls are skipped while a run is in progress: the run fetches the trades itself,
+    and the trades endpoint is paced at one request every 5 seconds.
+    """
+    seen = None
+    while not stopping.wait(poll):
+        if watcher.running:
+            continue
+        try:
+            data = generator.gateway.get_json("/v1/api/iserver/account/trades",
+                                              params={"days": 1, "accountId": generator.ACCOUNT_ID}, timeout=15,
+                                              cached=False)
+        except Exception as e:
+            print(f"⚠️ Execution check failed: {e}")
+            continue
+        current = {execution_hash(trade) for trade in generator._trades_from_response(data)}
+        if seen is not None and current - seen:
+            watcher.trigger(f"{len(current - seen)} new executions")
+        seen = current
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Regenerate the IBKR trading journal on a market-hours schedule, on new statement files "
+                    "and on new executions",
+        epilog="Any other arguments are passed to generator.py for every run, e.g. --formats xlsx,html")
+    parser.add_argument("--interval", type=float, default=WATCH_INTERVAL, help="Seconds between runs in market hours")
+    parser.add_argument("--off-hours-interval", type=float, default=WATCH_OFF_HOURS_INTERVAL,
+                        help="Seconds between runs outside market hours (0 pauses)")
+    parser.add_argument("--watch-dir", default=WATCH_DIR, help="Regenerate when statement files land here")
+    parser.add_argument("--execution-poll", type=float, default=WATCH_EXECUTION_POLL,
+                        help="Seconds between checks for new executions (0 disables)")
+    parser.add_argument("--debounce", type=float, default=WATCH_DEBOUNCE)
+    args, generator_args = parser.parse_known_args()
+
+    offline = "--offline" in generator_args or any(arg.startswith("--replay") for arg in generator_args)
+    keepalive = None
+    if not offline:
+        keepalive = generator.SessionKeepalive(generator.gateway, interval=generator.KEEPALIVE_INTERVAL).start()
+
+    watcher = Watcher(lambda: generator.main(generator_args, keepalive), debounce=args.debounce)
+    stopping = threading.Event()
+    triggers = [(interval_trigger, (args.interval, args.off_hours_interval))]
+    if args.watch_dir:
+        triggers.append((directory_trigger, (args.watch_dir,)))
+    if args.execution_poll and not offline:
+        triggers.append((execution_trigger, (args.execution_poll,)))
+    for target, target_args in triggers:
+        threading.Thread(target=target, args=(watcher, stopping) + target_args, name=target.__name__, daemon=True).start()
+
+    print(f"🕰️ Watching: every {args.interval:g}s in market hours ({MARKET_HOURS[0]}-{MARKET_HOURS[1]} {MARKET_TIMEZONE}), "
+          f"{args.off_hours_interval:g}s outside, debounced over {args.debounce:g}s")
+    try:
+        watcher.loop(stopping)
+    except KeyboardInterrupt:
+        print("👋 Shutting down")
+    finally:
+        stopping.set()
+        if keepalive is not None:
+            keepalive.stop()